@@ -2,6 +2,9 @@ import asyncio
 from playwright.async_api import async_playwright
 import pandas as pd
 
+from resource_policy import ResourcePolicy
+from waits import wait_for_feed, wait_for_more_cards
+
 async def run():
     async with async_playwright() as p:
         # Connect to existing Chrome instance with Scrap.io extension
@@ -9,12 +12,13 @@ async def run():
 
         context = browser.contexts[0]
         page = await context.new_page()
+        await ResourcePolicy().attach(page)  # skip map tiles, photos and fonts
 
         stateName = "New York"
 
         # Open Google Maps search
         await page.goto(f"https://www.google.com/maps/search/Dental+Clinic+{stateName}/")
-        await page.wait_for_timeout(5000)  # allow extension to load
+        await wait_for_feed(page)
 
         # Keep scrolling until no new clinics load
         prev_count = -1
@@ -24,7 +28,7 @@ async def run():
                 break
             prev_count = len(cards)
             await page.evaluate("document.querySelector('div[role=feed]').scrollBy(0, 2000)")
-            await page.wait_for_timeout(20000)
+            await wait_for_more_cards(page, prev_count, timeout=20000)  # returns as soon as new cards load
 
         print(f"✅ Total Clinics Found: {len(cards)}")
 
@@ -2,14 +2,16 @@ import asyncio
 from playwright.async_api import async_playwright
 import pandas as pd
 
+from progress_store import ProgressStore
+from resource_policy import ResourcePolicy
+from waits import wait_for_feed, wait_for_more_cards
+
 US_STATES = [
-    #"Alabama", "Alaska",
-    "Arizona", "Arkansas", "California", "Colorado", "Connecticut", "Delaware",
+    "Alabama", "Alaska", "Arizona", "Arkansas", "California", "Colorado", "Connecticut", "Delaware",
     "Florida", "Georgia", "Hawaii", "Idaho", "Illinois", "Indiana", "Iowa", "Kansas", "Kentucky",
     "Louisiana", "Maine", "Maryland", "Massachusetts", "Michigan", "Minnesota", "Mississippi",
     "Missouri", "Montana", "Nebraska", "Nevada", "New Hampshire", "New Jersey", "New Mexico",
-    # "New York", 
-    "North Carolina", "North Dakota", "Ohio", "Oklahoma", "Oregon", "Pennsylvania",
+    "New York", "North Carolina", "North Dakota", "Ohio", "Oklahoma", "Oregon", "Pennsylvania",
     "Rhode Island", "South Carolina", "South Dakota", "Tennessee", "Texas", "Utah", "Vermont",
     "Virginia", "Washington", "West Virginia", "Wisconsin", "Wyoming"
 ]
@@ -17,7 +19,7 @@ US_STATES = [
 async def scrape_state(page, stateName):
     # Open Google Maps search
     await page.goto(f"https://www.google.com/maps/search/Dental+Clinic+{stateName}/")
-    await page.wait_for_timeout(5000)  # allow extension to load
+    await wait_for_feed(page)
 
     # Keep scrolling until no new clinics load
     prev_count = -1
@@ -27,7 +29,7 @@ async def scrape_state(page, stateName):
             break
         prev_count = len(cards)
         await page.evaluate("document.querySelector('div[role=feed]').scrollBy(0, 2000)")
-        await page.wait_for_timeout(15000)  # wait for new cards to load
+        await wait_for_more_cards(page, prev_count, timeout=15000)  # returns as soon as new cards load
 
     print(f"✅ {stateName}: Total Clinics Found: {len(cards)}")
 
@@ -82,11 +84,21 @@ async def run():
         browser = await p.chromium.connect_over_cdp("http://localhost:9014")
         context = browser.contexts[0]
         page = await context.new_page()
+        await ResourcePolicy().attach(page)  # skip map tiles, photos and fonts
+
+        # States finished by an earlier run are skipped automatically
+        # (own store: this script writes different files than Scrap_Data_FinalScript.py)
+        progress = ProgressStore("scrape_progress_list_view.db")
+        done_states = progress.done_states()
 
         # Loop through all US states
         for state in US_STATES:
+            if state in done_states:
+                print(f"♻️ Skipping {state}: already done")
+                continue
             try:
                 await scrape_state(page, state)
+                progress.mark_state_done(state)
             except Exception as e:
                 print(f"⚠️ Skipping {state} due to error: {e}")
 
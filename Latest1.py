@@ -2,6 +2,10 @@ import asyncio
 from playwright.async_api import async_playwright
 import pandas as pd
 
+from resource_policy import ResourcePolicy
+from waits import wait_for_feed, wait_for_more_cards, wait_for_detail, wait_for_scrapio_rows, mark_scrapio_rows_stale
+from dedupe_index import place_id_from_url
+
 # US 50 states 
 US_STATES = [
     "Alabama", "Alaska", "Arizona", "Arkansas", "California", "Colorado", "Connecticut", "Delaware",
@@ -15,7 +19,7 @@ US_STATES = [
 async def scrape_state(page, stateName):
     # Open Google Maps search
     await page.goto(f"https://www.google.com/maps/search/Dental+Clinic+{stateName}/")
-    await page.wait_for_timeout(5000)  # allow extension to load
+    await wait_for_feed(page)
 
     # Keep scrolling until no new clinics load
     prev_count = -1
@@ -27,7 +31,7 @@ async def scrape_state(page, stateName):
 
         # 🔑 scroll feed to trigger loading
         await page.evaluate("document.querySelector('div[role=feed]').scrollBy(0, 2000)")
-        await page.wait_for_timeout(20000)
+        await wait_for_more_cards(page, prev_count, timeout=20000)  # returns as soon as new cards load
 
     print(f"✅ {stateName}: Total Clinics Found: {len(cards)}")
 
@@ -35,7 +39,7 @@ async def scrape_state(page, stateName):
     await page.evaluate("document.querySelector('div[role=feed]').scrollTo(0, 0)")
 
     data = []
-    
+    previous_name = ""
 
     for i in range(len(cards)):
         base_row = {}
@@ -51,8 +55,14 @@ async def scrape_state(page, stateName):
         clinicCard = await page.query_selector(f"xpath={xpath_str}")
 
         if clinicCard:
+            expected_name = await clinicCard.get_attribute("aria-label") or ""
+            place = place_id_from_url(await clinicCard.get_attribute("href"))
+            await mark_scrapio_rows_stale(page)
             await clinicCard.click()
-            await page.wait_for_timeout(5000)  # wait for details to load
+            # wait for the detail pane to switch to this place (chains share a name), then for the Scrap.io rows
+            await wait_for_detail(page, expected_name, previous_name,
+                                  place="" if place.startswith("/maps/place/") else place)
+            await wait_for_scrapio_rows(page)
         else:
             print("⚠️ Could not find clickable element in card")
             continue
@@ -64,13 +74,12 @@ async def scrape_state(page, stateName):
             print(f"📌 Clinic: {clinicName}")
 
             base_row["Clinic Name"] = clinicName
+            previous_name = clinicName
         except:
             base_row["Clinic Name"] = ""
 
         # ---- Address ----
         try:
-            #scroll till address is visible
-            await page.wait_for_timeout(3000)
             address_el = await page.query_selector(
                 "(//*[@class='Io6YTe fontBodyMedium kR99db fdkmkc '])[1]"
             )
@@ -183,6 +192,7 @@ async def run():
         browser = await p.chromium.connect_over_cdp("http://localhost:9014")
         context = browser.contexts[0]
         page = await context.new_page()
+        await ResourcePolicy().attach(page)  # skip map tiles, photos and fonts
 
         for state in US_STATES:
             try:
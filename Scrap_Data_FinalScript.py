@@ -1,7 +1,35 @@
+import argparse
 import asyncio
 from playwright.async_api import async_playwright
-import pandas as pd
 import os
+import time
+import traceback
+from urllib.parse import urljoin
+
+from waits import (
+    wait_for_feed, wait_for_more_cards,
+    wait_for_detail, wait_for_scrapio_rows, mark_scrapio_rows_stale, print_wait_stats, END_OF_LIST_XPATH,
+)
+from extraction import (
+    extract_detail, extract_detail_legacy, extract_list, needs_detail, clinic_key, legacy_call_count,
+    merge_detail,
+)
+from clinic_model import Clinic
+from progress_store import ProgressStore, DEFAULT_PROGRESS_DB
+from sinks import ClinicSink, export_wide
+from dedupe_index import DedupeIndex, DEFAULT_DEDUPE_DB, place_id_from_url
+from resource_policy import ResourcePolicy
+from governor import RateGovernor, ThrottleDetected
+from page_lifecycle import PageRecycler
+from snapshot_archive import SnapshotArchive, DEFAULT_SNAPSHOT_DIR
+from detail_cache import DetailCache, DEFAULT_DETAIL_CACHE_DB, DETAIL_CACHE_TTL_DAYS
+from network_results import SearchResponseCapture
+from job_queue import JobQueue, LocalShardQueue, SharedShardQueue, DEFAULT_JOBS_DB
+from metrics import RunMetrics, DEFAULT_METRICS_LOG, DEFAULT_PROMETHEUS_FILE
+from browser_pool import BrowserPool, parse_endpoints, DEFAULT_CDP_ENDPOINTS
+from chrome_fleet import ChromeFleet, fleet_size, EXTENSION_DIR
+import sharding
+from sharding import plan_shards, state_shard, subdivide, needs_split, in_shard, load_cities
 
 # US 50 states 
 US_STATES = [
@@ -14,241 +42,819 @@ US_STATES = [
     "Virginia", "Washington", "West Virginia", "Wisconsin",
       "Wyoming"]
 
-async def scrape_state(page, stateName):
-    print(f"🚀 Starting to scrape {stateName}...")
-    
-    # Open Google Maps search
-    await page.goto(f"https://www.google.com/maps/search/Dental+Clinic+{stateName}/")
-    await page.wait_for_timeout(5000)  # allow extension to load
-
-    prev_count = -1
-    no_results_found = False
-
-    # Phase 1: Scroll until card count stops increasing
-    while True:
-        cards = await page.query_selector_all("//*[@class='qBF1Pd fontHeadlineSmall ']")
-
-        if len(cards) == prev_count:
-            break  # move to "No search results" waiting phase
-        prev_count = len(cards)
-
-        await page.evaluate("document.querySelector('div[role=feed]').scrollBy(0, 2000)")
-        await page.wait_for_timeout(5000)  # 5 seconds wait
-
-    # Phase 2: Wait for "No Search Results" text (max 5 mins)
-    MAX_WAIT_NO_RESULTS = 300  # seconds
-    WAIT_INTERVAL = 5  # seconds
-    waited = 0
-
-    while waited < MAX_WAIT_NO_RESULTS:
-        no_results = await page.query_selector("//*[contains(text(), 'reached the end of the list.')]")
-        if no_results:
-            print("✅ 'You have reached the end of the list.' message detected.")
-            no_results_found = True
-            break
-
-        await page.wait_for_timeout(WAIT_INTERVAL * 1000)
-        waited += WAIT_INTERVAL
-
-    if not no_results_found:
-        print("⏳ Timeout: 'No Search Results' message not found within 5 minutes.")
-
-    print(f"✅ {stateName}: Total Clinics Found: {len(cards)}")
-
-
-    # If no clinics found, save empty file and continue
-    if len(cards) == 0:
-        df = pd.DataFrame()
-        filename = f"scrapio_clinics_{stateName.replace(' ', '_')}.xlsx"
-        df.to_excel(filename, index=False, engine='openpyxl')
-        print(f"⚠️ No clinics found for {stateName}. Empty file saved.")
-        return
-
-    # scroll back to top
-    await page.evaluate("document.querySelector('div[role=feed]').scrollTo(0, 0)")
-
-    data = []
-    
-    for i in range(len(cards)):
-        base_row = {}
-
-        clinic_index = i + 1
-
-        # ---- Click clinic card ----
-        # Dynamic XPath
-        xpath_str = f"(//*[@class='hfpxzc'])[{clinic_index}]"
-
-        print(f"---- Processing clinic {clinic_index}/{len(cards)} in {stateName} ----")
-
-        clinicCard = await page.query_selector(f"xpath={xpath_str}")
-
-        if clinicCard:
-            await clinicCard.click()
-            await page.wait_for_timeout(5000)  # wait for details to load
+# Number of browser tabs scraping states at the same time, per Chrome instance.
+# Keep this low enough that Google Maps doesn't start rate limiting us.
+NUM_WORKERS = int(os.environ.get("NUM_WORKERS", 4))
+
+# Chrome + Scrap.io instances to spread the tabs over (comma separated CDP URLs)
+CDP_ENDPOINTS = parse_endpoints(os.environ.get("CDP_ENDPOINTS", ",".join(DEFAULT_CDP_ENDPOINTS)))
+
+# "evaluate" reads each detail pane with one in-page script,
+# "legacy" queries every field separately (one CDP round-trip per field)
+EXTRACTION_MODE = os.environ.get("EXTRACTION_MODE", "evaluate")
+
+# "hybrid" reads every card from the result list and only skips the detail pane
+# for cards that already show a full address and the HYBRID_REQUIRED_CONTACTS
+# (see extraction.needs_detail; live cards usually only show the street, so most
+# still get the pane), "click" opens every card
+SCRAPE_MODE = os.environ.get("SCRAPE_MODE", "hybrid")
+
+# "url" opens every place link captured from the feed in its own detail tab(s),
+# "click" clicks the card in the feed like before
+DETAIL_MODE = os.environ.get("DETAIL_MODE", "url")
+DETAIL_TABS = int(os.environ.get("DETAIL_TABS", 2))  # detail tabs per worker in "url" mode
+DETAIL_RETRIES = 2
+
+# "network" reads new results from the Maps search responses as the feed pages in
+# (falling back to the cards when a response doesn't parse), "dom" reads the cards.
+# Network records carry no Scrap.io items, so they always go to the detail tabs:
+# only used with DETAIL_MODE=url and without --snapshots.
+RESULT_SOURCE = os.environ.get("RESULT_SOURCE", "dom")
+RECORD_RESPONSES_DIR = os.environ.get("RECORD_RESPONSES")  # save raw search responses here
+
+# How often a shard that hit a block page, crashed its tab or lost its browser
+# is retried before it counts as failed (jobs in a shared --queue carry their own limit)
+MAX_SHARD_ATTEMPTS = 5
+
+# How long the producer keeps scrolling without new cards before giving up
+# on the "reached the end of the list" message
+MAX_WAIT_NO_RESULTS = 300  # seconds
+
+# Scrap.io decorates result cards some seconds after Maps renders them. Cards without
+# its items are re-read until they show up, for at most this long, before being queued
+# (queued bare, hybrid mode would open the detail pane for every one of them)
+SCRAPIO_CARD_WAIT = float(os.environ.get("SCRAPIO_CARD_WAIT", 8))  # seconds, 0 = don't wait
+# and how long a detail pane gets to show its Scrap.io rows
+SCRAPIO_ROW_WAIT = int(os.environ.get("SCRAPIO_ROW_WAIT", 3000))  # ms, 0 = don't wait
+
+# Clinics are streamed to disk as they finish, as a clinics table and a long
+# contacts table: "csv", "parquet" or "sqlite" (see clinic_model.py).
+# The wide .xlsx deliverable is derived from those at the end of each state.
+OUTPUT_FORMAT = os.environ.get("OUTPUT_FORMAT", "csv")
+EXPORT_EXCEL = os.environ.get("EXPORT_EXCEL", "1") == "1"
+FLUSH_ROWS = 200
+FLUSH_SECONDS = 30
+
+# Abort map tiles, imagery, photos and fonts we never read.
+# Run once with BLOCK_RESOURCES=0 to record the baseline the savings are measured against.
+BLOCK_RESOURCES = os.environ.get("BLOCK_RESOURCES", "1") == "1"
+
+
+class RunServices:
+    """Helpers shared by every worker during one run. Any of them but metrics can be None."""
+
+    def __init__(self, progress=None, dedupe=None, resources=None, metrics=None, governor=None, pages=None,
+                 snapshots=None, details=None):
+        self.progress = progress      # ProgressStore: finished states / clinics
+        self.dedupe = dedupe          # DedupeIndex: places owned by other states
+        self.resources = resources    # ResourcePolicy: request blocking + traffic meters
+        self.metrics = metrics or RunMetrics(log_path=None)  # phase timings (in memory only by default)
+        self.governor = governor      # RateGovernor: adaptive pacing / throttle backoff
+        self.pages = pages            # PageRecycler: swaps heavy or crashed tabs for fresh ones
+        self.snapshots = snapshots    # SnapshotArchive: raw card / pane HTML for offline re-extraction
+        self.details = details        # DetailCache: detail records of earlier runs, reused until they expire
+
+
+async def open_detail(page, clinic_index, previous_name, href="", metrics=None, stateName=None, with_html=False,
+                      position=None):
+    """
+    Click a result card and read its detail pane. Returns None if the card is missing.
+    The card is found by its place link when we have one, otherwise by `position`, the
+    card's 0-based place in the feed as recorded when it was harvested.
+    """
+    metrics = metrics or RunMetrics(log_path=None)
+
+    # ---- Click clinic card ----
+    with metrics.phase("click", stateName, clinic_index):
+        if href:
+            href_escaped = href.replace('"', '\\"')
+            clinicCard = await page.query_selector(f'div[role=feed] a.hfpxzc[href="{href_escaped}"]')
+        elif position is not None:
+            # same cards, same order as extract_list numbered them
+            xpath_str = f"(//div[@role='feed']//a[contains(concat(' ', @class, ' '), ' hfpxzc ')])[{position + 1}]"
+            clinicCard = await page.query_selector(f"xpath={xpath_str}")
         else:
-            print("⚠️ Could not find clickable element in card")
-            continue
-
-        # ---- Clinic Name ----
-        try:
-            clinicName = await page.query_selector("xpath=//h1[contains(@class,'DUwDvf')]")
-            clinicName = await clinicName.inner_text()
-            print(f"📌 Clinic: {clinicName}")
+            clinicCard = None
+        metrics.cdp()
 
-            base_row["Clinic Name"] = clinicName
-        except:
-            base_row["Clinic Name"] = ""
+        if not clinicCard:
+            print("⚠️ Could not find clickable element in card")
+            return None
 
-        # ---- Address ----
         try:
-            #scroll till address is visible
-            await page.wait_for_timeout(3000)
-            address_el = await page.query_selector(
-                "(//*[@class='Io6YTe fontBodyMedium kR99db fdkmkc '])[1]"
-            )
+            expected_name = await clinicCard.get_attribute("aria-label") or ""
+            place = place_id_from_url(href or await clinicCard.get_attribute("href"))
+            if place.startswith("/maps/place/"):
+                place = ""  # only a name: the URL can't tell two same-name places apart either
+            # the previous pane's rows must not pass for this clinic's
+            await mark_scrapio_rows_stale(page)
+            await clinicCard.click()
+        finally:
+            await clinicCard.dispose()
+        metrics.cdp(4 if href else 5)
+
+    # wait for the detail pane to switch to this place (same-name chains share a heading), then for the Scrap.io rows
+    with metrics.phase("detail_load", stateName, clinic_index):
+        if not await wait_for_detail(page, expected_name, previous_name, place=place):
+            metrics.count("wait_timeouts")
+        if SCRAPIO_ROW_WAIT and not await wait_for_scrapio_rows(page, SCRAPIO_ROW_WAIT):
+            metrics.count("wait_timeouts")
+        metrics.cdp(2)
+
+    # ---- Clinic Name / Address / Sponsored / scrapio data ----
+    with metrics.phase("extract", stateName, clinic_index):
+        if EXTRACTION_MODE == "evaluate":
+            record = await extract_detail(page, with_html)  # one round-trip for the whole pane
+            metrics.cdp()
+        else:
+            record = await extract_detail_legacy(page, with_html)
+            metrics.cdp(legacy_call_count(record))
+    return record
+
+
+async def open_place(page, href, metrics=None, stateName=None, clinic_index=None, governor=None, with_html=False):
+    """
+    Open a place link captured from the feed and read its detail pane.
+    Costs the same however long the feed is, and any tab can do it.
+    Returns None if the page never showed a clinic (the caller retries).
+    """
+    metrics = metrics or RunMetrics(log_path=None)
+
+    try:
+        with metrics.phase("detail_load", stateName, clinic_index):
+            await page.goto(urljoin(sharding.MAPS_BASE_URL + "/", href))
+            # fresh document: any heading is this place's heading
+            loaded = await wait_for_detail(page)
+            if not loaded:
+                metrics.count("wait_timeouts")
+            elif SCRAPIO_ROW_WAIT and not await wait_for_scrapio_rows(page, SCRAPIO_ROW_WAIT):
+                metrics.count("wait_timeouts")
+            metrics.cdp(3)
+
+        if not loaded:
+            if governor is not None:
+                await governor.is_blocked(page)
+            return None
+
+        with metrics.phase("extract", stateName, clinic_index):
+            if EXTRACTION_MODE == "evaluate":
+                record = await extract_detail(page, with_html)
+            else:
+                record = await extract_detail_legacy(page, with_html)
+            metrics.cdp(1 if EXTRACTION_MODE == "evaluate" else legacy_call_count(record))
+        return record
+    except Exception as e:
+        print(f"⚠️ Could not open {href}: {e}")
+        return None
+
+
+async def open_detail_tab(context, services, meter=None):
+    """A new detail tab; its traffic goes into `meter`, the feed tab's, so the state's report covers it."""
+    detail_page = await context.new_page()
+    if services.resources is not None:
+        await services.resources.attach(detail_page, meter)
+    if services.pages is not None:
+        services.pages.track(detail_page)
+    return detail_page
+
+
+async def fresh_detail_tab(detail_pages, slot, services):
+    """The detail tab in `slot`, swapped for a new one first if it crashed or grew too heavy."""
+    detail_page = detail_pages[slot]
+    if services.pages is None:
+        return detail_page
+    reason = await services.pages.reason_to_recycle(detail_page, services.pages.max_clinics)
+    if reason:
+        context = detail_page.context
+        meter = services.resources.meter_for(detail_page) if services.resources is not None else None
+        detail_pages[slot] = await services.pages.replace(
+            detail_page,
+            lambda: open_detail_tab(context, services, meter),
+            lambda p: close_worker_page(p, services),
+            reason,
+        )
+    return detail_pages[slot]
+
+
+async def fetch_detail(page, detail_pages, slot, list_record, clinic_index, previous_name, services, stateName):
+    """
+    Open one clinic's detail pane, paced by the governor and retried while it comes back empty.
+    In "url" mode it opens in detail_pages[slot], which is recycled when it crashes or gets heavy.
+    Returns None when every attempt came back empty.
+    """
+    metrics, governor = services.metrics, services.governor
+    with_html = services.snapshots is not None
+
+    for attempt in range(1, DETAIL_RETRIES + 1):
+        detail_page = await fresh_detail_tab(detail_pages, slot, services) if detail_pages else None
+        if governor is not None:
+            await governor.acquire()
+
+        started = time.monotonic()
+        if detail_page is not None and list_record["href"]:
+            record = await open_place(detail_page, list_record["href"], metrics, stateName, clinic_index,
+                                      governor, with_html)
+        else:
+            record = await open_detail(page, clinic_index, previous_name, list_record["href"], metrics, stateName,
+                                       with_html, list_record.get("index"))
+
+        empty = record is None or not (record["name"] or record["address"])
+        if governor is not None:
+            governor.report((time.monotonic() - started) * 1000, empty=empty)
+        if not empty:
+            if detail_page is not None and services.pages is not None:
+                services.pages.done(detail_page)
+            return record
+
+        if attempt < DETAIL_RETRIES:
+            metrics.count("retries")
+            print(f"🔁 Empty detail pane for {list_record['name']}, retrying ({attempt}/{DETAIL_RETRIES - 1})")
+
+    metrics.count("empty_details")
+    return None
+
+
+async def recheck_cards(page, held, with_html=False):
+    """
+    Re-read the cards in `held` (feed index -> (record, first seen)) that Scrap.io hadn't
+    decorated yet. Returns the ones that now have items or waited SCRAPIO_CARD_WAIT, and
+    drops them from `held`.
+    """
+    if not held:
+        return []
+    now = time.monotonic()
+    fresh = {card["index"]: card for card in await extract_list(page, with_html=with_html, indexes=sorted(held))}
+    ready = []
+    for index, (record, since) in list(held.items()):
+        card = fresh.get(index, record)
+        if card["scrapio"] or now - since >= SCRAPIO_CARD_WAIT:
+            del held[index]
+            ready.append(card)
+    return ready
+
+
+async def produce_cards(page, stateName, queue, stats, metrics, consumers=1, with_html=False, capture=None,
+                        shard=None):
+    """
+    Scroll the feed and hand every new card to the extraction queue as soon as it shows up.
+    Cards Scrap.io hasn't decorated yet are held back and re-read for up to SCRAPIO_CARD_WAIT.
+    Stops on "reached the end of the list", or after MAX_WAIT_NO_RESULTS seconds without new cards.
+    With `with_html` the queued records carry their card HTML for the snapshot archive.
+    With a `capture` new results come from the search responses; the cards are only read
+    once for the results embedded in the first page, or again if a response didn't parse.
+    For a tile `shard`, places outside its box still count as found (the result cap applies
+    to them too) but aren't queued: the neighbouring tile owns them.
+    """
+    seen = set()  # places already queued
+    harvested = 0  # cards read from the DOM
+    held = {}  # feed index -> (card, first seen): cards still waiting for Scrap.io
+    stalled_since = None
+    first_pass = True
+
+    async def enqueue(records):
+        for record in records:
+            # cards and responses link the same place differently; match on the feature id
+            key = place_id_from_url(record["href"]) or clinic_key(record)
+            if key in seen:
+                continue
+            seen.add(key)
+            if shard is not None and not in_shard(shard, record):
+                stats["outside_tile"] += 1
+                continue
+            await queue.put(record)
+
+    try:
+        while True:
+            with metrics.phase("list_extract", stateName):
+                # a locator count leaves no element handle behind, unlike query_selector
+                end_of_list = await page.locator(f"xpath={END_OF_LIST_XPATH}").count() > 0
+                metrics.cdp()
+                records = capture.take() if capture is not None else []
+                if capture is None or not capture.usable or first_pass:
+                    cards = await extract_list(page, start=harvested, with_html=with_html)
+                    harvested += len(cards)
+                    metrics.cdp()
+                    now = time.monotonic()
+                    for card in cards:
+                        if card["scrapio"] or SCRAPIO_CARD_WAIT <= 0:
+                            records.append(card)
+                        else:
+                            held[card["index"]] = (card, now)
+                if held:
+                    records += await recheck_cards(page, held, with_html)
+                    metrics.cdp()
+            first_pass = False
+            await enqueue(records)
+
+            if end_of_list:
+                print("✅ 'You have reached the end of the list.' message detected.")
+                break
+
+            # Always jump to the bottom: clicks in the consumer scroll the feed around
+            with metrics.phase("scroll", stateName):
+                await page.evaluate("document.querySelector('div[role=feed]').scrollTo(0, document.querySelector('div[role=feed]').scrollHeight)")
+                if capture is not None and capture.usable:
+                    grew = await capture.wait_for_more(timeout=5000)
+                    metrics.cdp()
+                else:
+                    grew = await wait_for_more_cards(page, harvested, timeout=5000)
+                    metrics.cdp(2)
+
+            if grew:
+                if stalled_since is not None:
+                    # the feed stalled and then came back: that time went to waiting
+                    metrics.record("end_of_list_wait", (time.monotonic() - stalled_since) * 1000, stateName)
+                stalled_since = None
+            elif stalled_since is None:
+                stalled_since = time.monotonic()
+            elif time.monotonic() - stalled_since > MAX_WAIT_NO_RESULTS:
+                print("⏳ Timeout: 'No Search Results' message not found within 5 minutes.")
+                break
+
+        # the last cards may still be waiting for Scrap.io
+        with metrics.phase("scrapio_wait", stateName):
+            while held:
+                await asyncio.sleep(0.5)
+                await enqueue(await recheck_cards(page, held, with_html))
+                metrics.cdp()
+    finally:
+        if stalled_since is not None:
+            metrics.record("end_of_list_wait", (time.monotonic() - stalled_since) * 1000, stateName)
+        stats["found"] = len(seen)
+        for _ in range(consumers):
+            await queue.put(None)  # tell every consumer there is nothing more coming
+
+    outside = f" ({stats['outside_tile']} outside the tile, left to its neighbours)" if stats.get("outside_tile") else ""
+    print(f"✅ {stateName}: Total Clinics Found: {len(seen)}{outside}")
+
+
+async def consume_cards(page, stateName, queue, sink, written, stats, services, done_keys=(), detail_pages=(), slot=0):
+    """
+    Turn queued list records into rows, opening the detail pane only when needed.
+    With `detail_pages` the pane is opened from the card's place link in detail_pages[slot],
+    otherwise by clicking the card in the feed on `page`.
+    Rows go to `sink`; `written` holds the (name, address) pairs already written for this state.
+    Clinics in `done_keys` were finished by an earlier run and are skipped;
+    every new clinic is journaled to the progress store as soon as its rows are built.
+    Clinics another state already owns in the dedupe index are skipped before any click.
+    Places with a fresh entry in the detail cache reuse it instead of opening the pane.
+    """
+    progress, dedupe, metrics, details = services.progress, services.dedupe, services.metrics, services.details
+    previous_name = ""
 
-            clinicAddress = await address_el.inner_text()
-            print(f"🏠 Address: {clinicAddress}")
+    while True:
+        list_record = await queue.get()
+        if list_record is None:
+            break
 
-            base_row["Address"] = clinicAddress
-        except:
-            base_row["Address"] = ""
+        key = clinic_key(list_record)
+        if key in done_keys:
+            stats["resumed"] += 1
+            continue
 
-        # ---- Sponsored ----
-        try:
-            sponsored_el = await page.query_selector("xpath=//span[contains(text(),'Sponsored')]")
-            base_row["Sponsored"] = await sponsored_el.inner_text() if sponsored_el else ""
-        except:
-            base_row["Sponsored"] = ""
+        if dedupe is not None and dedupe.is_duplicate(list_record, stateName):
+            print(f"♻️ Already scraped for another state, skipped: {list_record['name']}")
+            continue
 
-        print(f"📌 Clinic: {base_row['Clinic Name']} | Sponsored: {base_row['Sponsored']}")
+        stats["processed"] += 1
+        clinic_index = stats["processed"]
+        clinic_started = time.monotonic()
 
-        # ---- scrapio data ----
-        scrapio_items = await page.query_selector_all(
-            "xpath=//*[@class='m6QErb DxyBCb kA9KIf dS8AEf XiKgde ']//*[@class='scrapio-card-main__body']//*[@class='scrapio-card-main__rows']/div"
-        )
+        print(f"---- Processing clinic {clinic_index} in {stateName} ----")
 
-        # Collect multiple values
-        emails, phones, websites, facebooks, instagrams, contacts, youtubes, twitters, linkedins = ([] for _ in range(9))
+        cached = None
+        if SCRAPE_MODE == "hybrid" and not needs_detail(list_record):
+            record = list_record
+            stats["clicks_avoided"] += 1
+        else:
+            cached = details.get(list_record) if details is not None else None
+            if cached is not None:
+                record = cached
+                stats["cache_hits"] += 1
+            else:
+                record = await fetch_detail(page, detail_pages, slot, list_record, clinic_index, previous_name,
+                                            services, stateName)
+                if record is None:
+                    # not journaled, so a resumed run tries this clinic again
+                    print(f"⚠️ No details for {list_record['name']}, skipped")
+                    continue
+
+                # keep what the list view already had if the pane came back empty
+                record = merge_detail(list_record, record)
+                if details is not None and details.put(list_record, record) == "changed":
+                    metrics.count("details_changed")
+
+            # the list view may not have had an address to match on; check again
+            if dedupe is not None and not list_record["address"] and dedupe.owner(record) not in (None, stateName):
+                print(f"♻️ Already scraped for another state, skipped: {record['name']}")
+                continue
 
-        for item in scrapio_items:
+        if record["name"]:
+            previous_name = record["name"]
 
-            dtype = await item.get_attribute("data-type")
-            print(f"Found scrapio item: {dtype}")
+        # keep the raw HTML so a parser fix can be replayed offline (snapshot_archive.py)
+        if services.snapshots is not None:
+            detail_html = record.pop("html", None) if record is not list_record else None
+            # a cached pane has no HTML left to archive, so archive the record it gave
+            services.snapshots.add(stateName, key, list_record, detail_html, record if cached is not None else None)
 
-            a_tag = await item.query_selector("a")
-            if a_tag:
-                href = await a_tag.get_attribute("href")
-                print(f"Href: {href}")
+        print(f"📌 Clinic: {record['name']} | Sponsored: {record['sponsored']}")
+        print(f"🏠 Address: {record['address']}")
+        print(f"Found scrapio items: {[item['type'] for item in record['scrapio']]}")
 
-            if not dtype:
-                continue
+        # 🔥 Remove duplicates by Clinic Name + Address
+        if (record["name"], record["address"]) in written:
+            print("♻️ Duplicate clinic, skipped")
+            journal = []
+        else:
+            written.add((record["name"], record["address"]))
+            with metrics.phase("parse", stateName, clinic_index):
+                clinic = Clinic.from_record(record)
+            with metrics.phase("write", stateName, clinic_index):
+                sink.write(clinic)
+            if dedupe is not None:
+                dedupe.add(record, stateName)
+            journal = clinic.to_json()
+
+        if progress is not None:
+            progress.mark_clinic_done(stateName, key, journal)
+
+        clinic_ms = (time.monotonic() - clinic_started) * 1000
+        stats["clinic_ms"].append(clinic_ms)
+        metrics.record("clinic", clinic_ms, stateName, clinic_index)
+
+        if stats["first_record_s"] is None:
+            stats["first_record_s"] = time.monotonic() - stats["started"]
+            print(f"⏱️ {stateName}: first record after {stats['first_record_s']:.1f}s")
+
+
+async def run_together(*coros):
+    """
+    Run coroutines side by side. If one fails, the others are cancelled and awaited
+    before the exception goes up, so nothing keeps using the tab, sink or detail tabs
+    the caller is about to clean up (and the caller sees the original exception).
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        # also reached when we are cancelled ourselves
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    for task in tasks:
+        if task.done() and not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+
+
+async def scrape_state(page, stateName, services=None, shard=None):
+    """
+    Scrape one search for `stateName`. Without a shard that is the whole-state search;
+    with one, `shard.id` names the output file, progress entry and dedupe owner.
+    Returns the run stats (clinics found, processed, ...).
+    """
+    services = services or RunServices()
+    shard = shard or state_shard(stateName)
+    progress, dedupe, metrics = services.progress, services.dedupe, services.metrics
+    meter = services.resources.meter_for(page) if services.resources is not None else None
+
+    # Everything below is keyed by the work unit, which is the state itself when unsharded
+    stateName = shard.id
 
-            if dtype == "emails":
-                emails.append(href.replace("mailto:", "") if href else "")
-            elif dtype.startswith("phone"):
-                phones.append(href.replace("tel:", "") if href else "")
-            elif dtype == "website":
-                websites.append(href)
-            elif dtype == "facebook":
-                facebooks.append(href)
-            elif dtype == "instagram":
-                instagrams.append(href)
-            elif dtype == "contact_pages":
-                contacts.append(href)
-            elif dtype == "youtube":
-                youtubes.append(href)
-            elif dtype == "twitter":
-                twitters.append(href)
-            elif dtype == "linkedin":
-                linkedins.append(href)
-
-        # Find max rows needed
-        max_len = max(
-            len(emails),
-            len(phones),
-            len(websites),
-            len(facebooks),
-            len(instagrams),
-            len(contacts),
-            len(youtubes),
-            len(twitters),
-            len(linkedins),
-            1,
+    print(f"🚀 Starting to scrape {stateName}...")
+    
+    # Open Google Maps search
+    if meter is not None:
+        meter.reset()
+    if services.governor is not None:
+        await services.governor.acquire()
+
+    # listen before navigating so the first search response isn't missed
+    capture = None
+    if RESULT_SOURCE == "network" and DETAIL_MODE == "url" and services.snapshots is None:
+        capture = SearchResponseCapture(RECORD_RESPONSES_DIR)
+        capture.attach(page)
+    try:
+        with metrics.phase("navigation", stateName):
+            await page.goto(shard.query_url)
+            await wait_for_feed(page)
+            metrics.cdp(2)
+        if services.governor is not None and await services.governor.is_blocked(page):
+            raise ThrottleDetected(f"{stateName}: Google showed a block page ({page.url})")
+    except BaseException:
+        if capture is not None:
+            capture.detach()
+        raise
+    if meter is not None:
+        meter.mark_loaded()
+
+    base_filename = f"scrapio_clinics_{stateName.replace(' ', '_')}"
+    sink = ClinicSink(OUTPUT_FORMAT, base_filename, batch_size=FLUSH_ROWS, flush_interval=FLUSH_SECONDS)
+    written = set()
+    detail_pages = []
+
+    try:
+        # Pick up clinics an earlier, interrupted run already finished:
+        # the journal is the source of truth, so replay its clinics into the fresh files
+        done_keys = progress.done_clinics(stateName) if progress is not None else set()
+        if done_keys:
+            print(f"♻️ Resuming {stateName}: {len(done_keys)} clinics already done")
+            for journal in progress.iter_clinic_rows(stateName):
+                if journal:
+                    clinic = Clinic.from_json(journal)
+                    written.add((clinic.name, clinic.address))
+                    sink.write(clinic)
+
+        # Scrolling and extraction run side by side: the producer feeds new cards into
+        # the queue while the consumers extract them, on the feed tab itself in "click"
+        # mode or from the captured place links in their own tabs in "url" mode.
+        if DETAIL_MODE == "url":
+            for _ in range(max(1, DETAIL_TABS)):
+                detail_pages.append(await open_detail_tab(page.context, services, meter))
+
+        queue = asyncio.Queue()
+        stats = {
+            "found": 0,
+            "processed": 0,
+            "resumed": 0,
+            "clicks_avoided": 0,
+            "cache_hits": 0,
+            "outside_tile": 0,
+            "first_record_s": None,
+            "clinic_ms": [],
+            "started": time.monotonic(),
+        }
+
+        consumers = [
+            consume_cards(page, stateName, queue, sink, written, stats, services, done_keys, detail_pages, slot)
+            for slot in range(len(detail_pages) or 1)
+        ]
+        await run_together(
+            produce_cards(page, stateName, queue, stats, metrics, len(consumers), services.snapshots is not None, capture,
+                          shard),
+            *consumers,
         )
+    finally:
+        if capture is not None:
+            capture.detach()
+            if not capture.usable:
+                metrics.count("network_fallbacks")
+        for detail_page in detail_pages:
+            await close_worker_page(detail_page, services)
+        if services.snapshots is not None:
+            services.snapshots.close_state(stateName)
+        with metrics.phase("write", stateName):
+            sink.close()
+
+    filename = sink.path
+    if EXPORT_EXCEL:
+        with metrics.phase("excel_export", stateName):
+            filename = export_wide(sink.clinics.path, sink.contacts.path, base_filename + ".xlsx")
+
+    metrics.state_done(stateName, stats)
+
+    # If no clinics found, the files only have their headers
+    if stats["found"] == 0:
+        print(f"⚠️ No clinics found for {stateName}. Empty file saved.")
+        return stats
 
-        # Build rows
-        for j in range(max_len):
-            row = {}
-            if j == 0:
-                row.update(base_row)  # include clinic info
-            else:
-                row["Clinic Name"] = ""
-                row["Address"] = ""
-                row["Sponsored"] = ""
-
-            row["Phone"] = phones[j] if j < len(phones) else (base_row.get("Phone", "") if j == 0 else "")
-            row["Email"] = emails[j] if j < len(emails) else ""
-            row["Website"] = websites[j] if j < len(websites) else (base_row.get("Website", "") if j == 0 else "")
-            row["Facebook"] = facebooks[j] if j < len(facebooks) else ""
-            row["Instagram"] = instagrams[j] if j < len(instagrams) else ""
-            row["Contact Page"] = contacts[j] if j < len(contacts) else ""
-            row["YouTube"] = youtubes[j] if j < len(youtubes) else ""
-            row["Twitter"] = twitters[j] if j < len(twitters) else ""
-            row["LinkedIn"] = linkedins[j] if j < len(linkedins) else ""
+    if SCRAPE_MODE == "hybrid":
+        print(f"🖱️ {stateName}: Clicks avoided: {stats['clicks_avoided']}/{stats['processed']}")
+    if services.details is not None:
+        print(f"🗄️ {stateName}: Detail panes reused from the cache: {stats['cache_hits']}/{stats['processed']}")
 
-            data.append(row)
+    if dedupe is not None:
+        hits, checked, rate = dedupe.hit_rate(stateName)
+        print(f"♻️ {stateName}: Dedupe hits: {hits}/{checked} ({rate:.0%}) already scraped for other states")
 
-        # If no scrapio data at all, at least add one row
-        if not scrapio_items:
-            data.append(base_row)
+    if meter is not None:
+        traffic = services.resources.record_state(stateName, meter)
+        print(f"📉 {stateName}: {traffic['bytes_loaded'] / 1e6:.1f} MB loaded (feed + detail tabs), "
+              f"{traffic['blocked']} requests blocked, feed ready in {traffic['load_ms'] / 1000:.1f}s")
+        if "bytes_saved" in traffic:
+            print(f"📉 {stateName}: {traffic['bytes_saved'] / 1e6:.1f} MB saved, "
+                  f"load time {traffic['load_ms_delta'] / 1000:+.1f}s vs. baseline")
 
-    # Save results for this state as Excel file
-    # df = pd.DataFrame(data)
-    # filename = f"scrapio_clinics_{stateName.replace(' ', '_')}.xlsx"
-    # df.to_excel(filename, index=False, engine='openpyxl')
+    print(f"🎉 Data for {stateName} saved to {filename}")
+    print(f"📊 Total records saved for {stateName}: {sink.clinics.rows_written} clinics "
+          f"with {sink.contacts.rows_written} contacts")
+    print(f"⏱️ {stateName} finished in {time.monotonic() - stats['started']:.1f}s")
+    return stats
+
+
+async def open_worker_page(pool, endpoint, services):
+    page = await pool.new_page(endpoint)
+    if page is not None and services.resources is not None:
+        await services.resources.attach(page)
+    if page is not None and services.pages is not None:
+        services.pages.track(page)
+    return page
+
+
+async def close_worker_page(page, services):
+    if services.resources is not None:
+        services.resources.detach(page)
+    if services.pages is not None:
+        services.pages.forget(page)
+    try:
+        await page.close()
+    except Exception:
+        pass  # the browser may already be gone
+
+
+async def state_worker(worker_id, pool, endpoint, queue, completed_states, failed_states, services):
+    # Each worker owns one tab on one endpoint and keeps pulling shards until the queue runs dry
+    page = await open_worker_page(pool, endpoint, services)
+    if page is None:
+        return
 
-    df = pd.DataFrame(data)
+    held = None  # the shard this worker still has to report back to the queue
 
-    # 🔥 Remove duplicates by Clinic Name + Address
-    df.drop_duplicates(subset=["Clinic Name", "Address"], inplace=True)
+    async def give_back(shard, reason, message):
+        # retried shards go back to the queue; ones out of attempts count as failed
+        nonlocal held
+        held = None
+        if await queue.retry(shard, reason):
+            print(f"{message}, requeueing it (attempt {shard.attempts})")
+            services.metrics.count("retries")
+        else:
+            print(f"⚠️ [Worker {worker_id}] {shard.id} failed too often, giving up: {reason}")
+            failed_states.append(shard.id)
 
-    filename = f"scrapio_clinics_{stateName.replace(' ', '_')}.xlsx"
-    df.to_excel(filename, index=False, engine='openpyxl')
+    try:
+        while True:
+            shard = await queue.get()
+            if shard is None:
+                return
+            held = shard
 
+            print(f"\n{'='*50}")
+            print(f"[Worker {worker_id}] Processing {shard.id} ({queue.pending()} more queued)")
+            print(f"{'='*50}")
 
-    print(f"🎉 Data for {stateName} saved to {filename}")
-    print(f"📊 Total records saved for {stateName}: {len(cards)}")
+            try:
+                stats = await scrape_state(page, shard.state, services, shard)
+            except ThrottleDetected as e:
+                # The governor has already paused everyone; try the shard again later
+                await give_back(shard, str(e), f"⛔ [Worker {worker_id}] {e}")
+                continue
+            except Exception as e:
+                if endpoint.connected and services.pages is not None and services.pages.is_dead(page):
+                    # Only the tab died: redo the shard on a new one (finished clinics are journaled)
+                    await give_back(shard, "tab crashed", f"💥 [Worker {worker_id}] Tab crashed during {shard.id}")
+                    page = await services.pages.replace(
+                        page,
+                        lambda: open_worker_page(pool, endpoint, services),
+                        lambda p: close_worker_page(p, services),
+                        "crashed",
+                    )
+                    if page is None:
+                        return
+                    continue
+
+                if endpoint.connected:
+                    print(f"⚠️ [Worker {worker_id}] Error processing {shard.id}: {e}")
+                    services.metrics.count("failed_states")
+                    held = None
+                    if not await queue.fail(shard, str(e)):
+                        failed_states.append(shard.id)
+                    continue
+
+                # The browser went away under us: hand the shard back and reconnect
+                await give_back(shard, f"lost {endpoint.url}",
+                                f"🔌 [Worker {worker_id}] Lost {endpoint.url} during {shard.id}")
+                await close_worker_page(page, services)
+                page = await open_worker_page(pool, endpoint, services)
+                if page is None:
+                    return
+                continue
 
+            # A full tile means Maps cut the results off: search its quarters too.
+            # The split is journaled with the shard, so --resume re-plans the children.
+            children = subdivide(shard) if needs_split(shard, stats["found"]) else []
+            completed_states.append(shard.id)
+            if services.progress is not None:
+                services.progress.mark_state_done(shard.id, split=bool(children))
+            print(f"✅ [Worker {worker_id}] Successfully completed {shard.id}")
+            if children:
+                print(f"🧩 {shard.id} hit the result cap, split into {len(children)} tiles")
+                await queue.add(children)
+            held = None
+            await queue.done(shard)
+
+            # Start the next search on a fresh tab once this one has done enough
+            if services.pages is not None:
+                services.pages.done(page)
+                reason = await services.pages.reason_to_recycle(page, services.pages.max_states)
+                if reason:
+                    page = await services.pages.replace(
+                        page,
+                        lambda: open_worker_page(pool, endpoint, services),
+                        lambda p: close_worker_page(p, services),
+                        reason,
+                    )
+                    if page is None:
+                        return
+
+            # Without a governor, add a small delay between states to avoid being rate limited
+            if services.governor is None:
+                await page.wait_for_timeout(3000)
+    finally:
+        if held is not None:
+            # don't leave the shard in flight: other workers would wait for it forever
+            if not await queue.fail(held, "worker stopped"):
+                failed_states.append(held.id)
+        if page is not None:
+            await close_worker_page(page, services)
+
+
+def pending_shards(shards, done, split):
+    """
+    The shards still to scrape: `shards` minus the `done` ones, plus the sub-tiles
+    of every done shard in `split` (recursively), which only existed in memory.
+    """
+    todo = []
+    stack = list(reversed(shards))
+    while stack:
+        shard = stack.pop()
+        if shard.id not in done:
+            todo.append(shard)
+        elif shard.id in split:
+            stack.extend(reversed(subdivide(shard)))
+    return todo
+
+
+async def run(num_workers=NUM_WORKERS, services=None, shards=None, endpoints=None, jobs=None, fleet=None):
+    """
+    Scrape `shards` with `num_workers` tabs per browser. With a JobQueue (`jobs`) the
+    shards are added to it and the workers pull from it, alongside any other
+    processes sharing the same queue; otherwise they use an in-memory queue.
+    With a ChromeFleet the browsers are launched here (and stopped at the end)
+    instead of connecting to `endpoints`.
+    """
+    services = services or RunServices()
+    shards = shards if shards is not None else plan_shards(US_STATES)
 
-async def run():
     async with async_playwright() as p:
-        browser = await p.chromium.connect_over_cdp("http://localhost:9014")
-        context = browser.contexts[0]
-        page = await context.new_page()
+        if fleet is not None:
+            endpoints = await fleet.start(p.chromium.executable_path)
+        pool = BrowserPool(p, endpoints or CDP_ENDPOINTS, fleet)
+        live_endpoints = await pool.start()
 
         completed_states = []
         failed_states = []
 
-        print(f"🌟 Starting scraping process for {len(US_STATES)} states...")
-        
-        for state_num, state in enumerate(US_STATES, 1):
-            print(f"\n{'='*50}")
-            print(f"Processing State {state_num}/{len(US_STATES)}: {state}")
-            print(f"{'='*50}")
-            
-            try:
-                await scrape_state(page, state)
-                completed_states.append(state)
-                print(f"✅ Successfully completed {state}")
-                
-                # Add a small delay between states to avoid being rate limited
-                await page.wait_for_timeout(3000)
-                
-            except Exception as e:
-                print(f"⚠️ Error processing {state}: {e}")
-                failed_states.append(state)
-                continue
+        # States / shards finished by an earlier run are skipped automatically,
+        # and the sub-tiles of finished tiles that were split are planned again
+        done_states = services.progress.done_states() if services.progress is not None else set()
+        split_states = services.progress.split_states() if services.progress is not None else set()
+        if done_states:
+            print(f"♻️ Skipping {len(done_states)} states/shards already completed: {', '.join(sorted(done_states))}")
+        todo = pending_shards(shards, done_states, split_states)
+
+        if jobs is not None:
+            added = jobs.enqueue(todo)
+            print(f"📥 {added} new jobs added to {jobs.path}; {jobs.counts()['queued']} queued in total")
+            queue = SharedShardQueue(jobs)
+        else:
+            queue = LocalShardQueue(todo, MAX_SHARD_ATTEMPTS)
+
+        if jobs is None:
+            num_workers = max(1, min(num_workers, queue.pending()))
+        print(f"🌟 Starting scraping process for {queue.pending()} searches across "
+              f"{len({shard.state for shard in shards})} states with {num_workers} tabs "
+              f"on each of {len(live_endpoints)} browsers...")
+
+        # Tabs on every endpoint pull from the same queue, so work flows to whichever
+        # browsers are alive; a failure in one state never stops the other workers.
+        # Workers return once the queue is drained (including shards they add
+        # themselves), or when their browser is gone for good.
+        worker_ids = []
+        workers = []
+        for endpoint_num, endpoint in enumerate(pool.endpoints, 1):
+            for tab in range(1, num_workers + 1):
+                worker_ids.append(f"{endpoint_num}.{tab}")
+                workers.append(asyncio.create_task(state_worker(
+                    worker_ids[-1], pool, endpoint, queue, completed_states, failed_states, services
+                )))
+        results = await asyncio.gather(*workers, return_exceptions=True)
+
+        # a worker only gets here on a bug or a broken store (its shard was already failed)
+        crashed_workers = []
+        for worker_id, result in zip(worker_ids, results):
+            if isinstance(result, BaseException):
+                print(f"💥 [Worker {worker_id}] stopped on an unexpected error: {result!r}")
+                traceback.print_exception(result)
+                services.metrics.count("worker_crashes")
+                crashed_workers.append(worker_id)
+
+        if jobs is None and queue.pending():
+            if crashed_workers:
+                print(f"💀 No worker left ({len(crashed_workers)} crashed); the remaining work is marked failed")
+            else:
+                print("💀 Every browser is gone; the remaining work is marked failed")
+            while queue.pending():
+                failed_states.append(queue.queue.popleft().id)
 
         # Summary
         print(f"\n{'='*60}")
@@ -256,14 +862,120 @@ async def run():
         print(f"{'='*60}")
         print(f"✅ Successfully completed: {len(completed_states)} states")
         print(f"❌ Failed: {len(failed_states)} states")
+        if crashed_workers:
+            print(f"💥 Workers crashed: {len(crashed_workers)} ({', '.join(crashed_workers)})")
         
         if completed_states:
             print(f"\n✅ Completed states: {', '.join(completed_states)}")
         
         if failed_states:
             print(f"\n❌ Failed states: {', '.join(failed_states)}")
+
+        if jobs is not None:
+            counts = jobs.counts()
+            print(f"\n📋 Job queue {jobs.path}: " + ", ".join(f"{n} {status}" for status, n in counts.items()))
+            if counts["dead"]:
+                print(f"   Requeue dead jobs with: python job_queue.py --db {jobs.path} requeue --dead")
             
-        print(f"\n📁 Excel files saved for each completed state")
+        print(f"\n📁 {OUTPUT_FORMAT.upper()} files saved for each completed state"
+              + (" (plus .xlsx exports)" if EXPORT_EXCEL else ""))
+
+        print_wait_stats()
+        services.metrics.print_summary()
+        if services.details is not None:
+            services.details.print_summary()
+
+        await pool.close()
+        if fleet is not None:
+            fleet.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape dental clinics for every US state from Google Maps + Scrap.io")
+    parser.add_argument("--resume", action="store_true",
+                        help="pick up an interrupted run from the progress store (fails if there is none)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="forget all saved progress and scrape every state again")
+    parser.add_argument("--progress-db", default=DEFAULT_PROGRESS_DB,
+                        help=f"SQLite progress store (default: {DEFAULT_PROGRESS_DB})")
+    parser.add_argument("--dedupe-db", default=DEFAULT_DEDUPE_DB,
+                        help=f"cross-state dedupe index (default: {DEFAULT_DEDUPE_DB})")
+    parser.add_argument("--no-block", action="store_true",
+                        help="load every resource (records the baseline for the bytes-saved report)")
+    parser.add_argument("--shard", choices=["state", "cities", "tiles"], default="state",
+                        help="split each state into city searches or lat/lng tiles to get past the ~120 result cap")
+    parser.add_argument("--cities-file", help='JSON {"State": ["City", ...]} for --shard cities')
+    parser.add_argument("--metrics-log", default=DEFAULT_METRICS_LOG,
+                        help=f"JSON Lines file for per-phase timings (default: {DEFAULT_METRICS_LOG})")
+    parser.add_argument("--prometheus-file", nargs="?", const=DEFAULT_PROMETHEUS_FILE,
+                        help=f"also keep Prometheus text metrics in this file (default name: {DEFAULT_PROMETHEUS_FILE})")
+    parser.add_argument("--snapshots", nargs="?", const=DEFAULT_SNAPSHOT_DIR,
+                        help=f"archive each clinic's raw card / pane HTML here for offline re-extraction "
+                             f"(default dir: {DEFAULT_SNAPSHOT_DIR})")
+    parser.add_argument("--queue", nargs="?", const=DEFAULT_JOBS_DB,
+                        help=f"pull shards from a shared SQLite job queue (default file: {DEFAULT_JOBS_DB}) "
+                             f"so several processes can work together; see job_queue.py")
+    parser.add_argument("--detail-cache", nargs="?", const=DEFAULT_DETAIL_CACHE_DB,
+                        help=f"reuse detail panes scraped less than --cache-ttl days ago from this cache "
+                             f"(default file: {DEFAULT_DETAIL_CACHE_DB}); see detail_cache.py")
+    parser.add_argument("--cache-ttl", type=float, default=DETAIL_CACHE_TTL_DAYS,
+                        help="days a cached detail pane stays valid")
+    parser.add_argument("--rate", type=float, default=1.0,
+                        help="starting request rate (req/s, all workers together); adapts to throttling")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS, help="number of browser tabs per Chrome instance")
+    parser.add_argument("--cdp", default=",".join(CDP_ENDPOINTS),
+                        help="comma separated CDP endpoints of the Chrome + Scrap.io instances to use")
+    parser.add_argument("--fleet", type=int, nargs="?", const=0,
+                        help="launch this many Chromium + Scrap.io instances instead of using --cdp "
+                             "(no number: as many as the CPUs / memory allow); see chrome_fleet.py")
+    parser.add_argument("--extension", default=EXTENSION_DIR, help="unpacked Scrap.io extension for --fleet")
+    parser.add_argument("--headed", action="store_true", help="show the --fleet browsers' windows")
+    args = parser.parse_args()
+
+    if args.resume and not os.path.exists(args.progress_db):
+        parser.error(f"nothing to resume: {args.progress_db} does not exist")
+    if args.shard == "cities" and not args.cities_file:
+        parser.error("--shard cities needs --cities-file")
+
+    cities = load_cities(args.cities_file) if args.cities_file else None
+    shards = plan_shards(US_STATES, args.shard, cities)
+
+    progress = ProgressStore(args.progress_db)
+    jobs = JobQueue(args.queue) if args.queue else None
+    if args.fresh:
+        progress.reset()
+        if jobs is not None:
+            jobs.reset()
+    elif args.resume:
+        summary = progress.summary()
+        print(f"♻️ Resuming: {summary['states_done']} states and {summary['clinics_done']} clinics already done")
+
+    dedupe = DedupeIndex(args.dedupe_db)
+    resources = ResourcePolicy(enabled=BLOCK_RESOURCES and not args.no_block)
+    metrics = RunMetrics(args.metrics_log, args.prometheus_file)
+    governor = RateGovernor(start_rate=args.rate, metrics=metrics)
+    snapshots = SnapshotArchive(args.snapshots) if args.snapshots else None
+    details = DetailCache(args.detail_cache, args.cache_ttl) if args.detail_cache else None
+    services = RunServices(progress, dedupe, resources, metrics, governor, PageRecycler(metrics=metrics), snapshots,
+                           details)
+    fleet = None
+    if args.fleet is not None:
+        fleet = ChromeFleet(fleet_size(args.fleet, args.workers), args.extension, headless=not args.headed)
+
+    try:
+        asyncio.run(run(args.workers, services, shards, parse_endpoints(args.cdp), jobs, fleet))
+    finally:
+        if fleet is not None:
+            fleet.stop()
+        progress.close()
+        dedupe.close()
+        if jobs is not None:
+            jobs.close()
+        metrics.close()
+        if snapshots is not None:
+            snapshots.close()
+        if details is not None:
+            details.close()
+
 
 if __name__ == "__main__":
-    asyncio.run(run())
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from playwright.async_api import async_playwright
+
+import sharding
+import Scrap_Data_FinalScript as scraper
+from maps_fixture_server import start_fixture_server, DEFAULT_CONFIG
+from metrics import percentile
+
+# Offline benchmark for scrape_state against the local Maps fixture
+# (maps_fixture_server.py) in a local headless Chromium. No Google, no extension.
+#
+#   python benchmark.py --results 300 --detail-latency-ms 400
+#
+# For every scrape / extraction / detail mode it reports clinics per minute,
+# per-clinic latency percentiles and memory (Python peak + page JS heap).
+
+MODES = [
+    # (label, SCRAPE_MODE, EXTRACTION_MODE, DETAIL_MODE)
+    ("click + legacy", "click", "legacy", "click"),
+    ("click + evaluate", "click", "evaluate", "click"),
+    ("url + evaluate", "click", "evaluate", "url"),
+    ("hybrid + click", "hybrid", "evaluate", "click"),
+    ("hybrid + url", "hybrid", "evaluate", "url"),
+]
+
+
+async def bench_mode(browser, label, scrape_mode, extraction_mode, detail_mode, state, verbose=False):
+    scraper.SCRAPE_MODE = scrape_mode
+    scraper.EXTRACTION_MODE = extraction_mode
+    scraper.DETAIL_MODE = detail_mode
+
+    page = await browser.new_page()
+    tracemalloc.start()
+    started = time.monotonic()
+    out = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with out:
+        stats = await scraper.scrape_state(page, state, scraper.RunServices(), sharding.state_shard(state))
+    elapsed = time.monotonic() - started
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    js_heap = await page.evaluate("performance.memory ? performance.memory.usedJSHeapSize : 0")
+    await page.close()
+
+    clinic_ms = stats["clinic_ms"]
+    return {
+        "mode": label,
+        "clinics": stats["processed"],
+        "seconds": round(elapsed, 2),
+        "clinics_per_min": round(stats["processed"] / elapsed * 60, 1) if elapsed else 0.0,
+        "first_record_s": round(stats["first_record_s"] or 0, 2),
+        "clicks_avoided": stats["clicks_avoided"],
+        "p50_ms": round(percentile(clinic_ms, 50), 1),
+        "p90_ms": round(percentile(clinic_ms, 90), 1),
+        "p99_ms": round(percentile(clinic_ms, 99), 1),
+        "mean_ms": round(statistics.mean(clinic_ms), 1) if clinic_ms else 0.0,
+        "py_peak_mb": round(py_peak / 1e6, 2),
+        "js_heap_mb": round(js_heap / 1e6, 2),
+    }
+
+
+def print_report(results):
+    print(f"\n{'='*100}")
+    print("BENCHMARK")
+    print(f"{'='*100}")
+    header = (f"{'mode':<20}{'clinics':>8}{'secs':>8}{'/min':>8}{'1st(s)':>8}{'skipped':>9}"
+              f"{'p50ms':>8}{'p90ms':>8}{'p99ms':>8}{'pyMB':>7}{'jsMB':>7}")
+    print(header)
+    for r in results:
+        print(f"{r['mode']:<20}{r['clinics']:>8}{r['seconds']:>8}{r['clinics_per_min']:>8}{r['first_record_s']:>8}"
+              f"{r['clicks_avoided']:>9}{r['p50_ms']:>8}{r['p90_ms']:>8}{r['p99_ms']:>8}"
+              f"{r['py_peak_mb']:>7}{r['js_heap_mb']:>7}")
+
+
+async def run_benchmark(config, modes=MODES, state="Benchmark", verbose=False, json_out=None):
+    server, base_url = start_fixture_server(**config)
+    sharding.MAPS_BASE_URL = base_url
+    scraper.EXPORT_EXCEL = False
+    print(f"🧪 Fixture at {base_url}: {config['results']} clinics, "
+          f"{config['detail_latency_ms']} ms detail latency, {config['feed_latency_ms']} ms feed latency")
+
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # per-state output files land here and are thrown away
+        try:
+            async with async_playwright() as p:
+                browser = await p.chromium.launch()
+                for label, scrape_mode, extraction_mode, detail_mode in modes:
+                    print(f"⏱️ {label}...")
+                    results.append(await bench_mode(browser, label, scrape_mode, extraction_mode, detail_mode,
+                                                    state, verbose))
+                await browser.close()
+        finally:
+            os.chdir(cwd)
+            server.shutdown()
+
+    print_report(results)
+    if json_out:
+        with open(json_out, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+        print(f"\n📁 Results saved to {json_out}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline scrape_state benchmark against a local Maps fixture")
+    for key, value in DEFAULT_CONFIG.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--modes", help="comma separated subset of: " + ", ".join(m[0] for m in MODES))
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="show the scraper's own output")
+    args = parser.parse_args()
+
+    config = {key: getattr(args, key) for key in DEFAULT_CONFIG}
+    modes = MODES
+    if args.modes:
+        wanted = {m.strip() for m in args.modes.split(",")}
+        modes = [m for m in MODES if m[0] in wanted]
+
+    asyncio.run(run_benchmark(config, modes, verbose=args.verbose, json_out=args.json))
+
+
+if __name__ == "__main__":
+    main()
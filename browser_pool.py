@@ -0,0 +1,121 @@
+import asyncio
+import json
+import urllib.request
+
+# A pool of Chrome + Scrap.io instances reached over CDP, possibly on other hosts.
+# Every endpoint is health-checked before use and reconnected after a disconnect;
+# workers on a dead endpoint put their work item back so the other endpoints pick it up.
+# Endpoints of a ChromeFleet (chrome_fleet.py) get their browser relaunched first if it died.
+
+DEFAULT_CDP_ENDPOINTS = ["http://localhost:9014"]
+
+HEALTH_CHECK_TIMEOUT = 5  # seconds
+RECONNECT_ATTEMPTS = 5
+RECONNECT_BACKOFF = 2  # seconds, doubled after every failed attempt
+
+
+def parse_endpoints(value):
+    """"http://a:9014, http://b:9014" -> ["http://a:9014", "http://b:9014"]"""
+    return [e.strip().rstrip("/") for e in value.split(",") if e.strip()]
+
+
+def _fetch_version(url):
+    with urllib.request.urlopen(f"{url}/json/version", timeout=HEALTH_CHECK_TIMEOUT) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+class BrowserEndpoint:
+    def __init__(self, url):
+        self.url = url
+        self.browser = None
+        self.context = None
+        self.dead = False
+        self.reconnects = 0
+        self.lock = asyncio.Lock()
+
+    @property
+    def connected(self):
+        return self.browser is not None and self.browser.is_connected()
+
+    def __repr__(self):
+        state = "dead" if self.dead else ("up" if self.connected else "down")
+        return f"BrowserEndpoint({self.url!r}, {state})"
+
+
+class BrowserPool:
+    def __init__(self, playwright, endpoints=None, fleet=None):
+        self.playwright = playwright
+        self.endpoints = [BrowserEndpoint(url) for url in (endpoints or DEFAULT_CDP_ENDPOINTS)]
+        self.fleet = fleet  # ChromeFleet the endpoints belong to, if we launched them
+
+    async def health_check(self, endpoint):
+        """True if the endpoint answers /json/version (ws:// endpoints are just tried)."""
+        if not endpoint.url.startswith("http"):
+            return True
+        try:
+            version = await asyncio.to_thread(_fetch_version, endpoint.url)
+            print(f"🩺 {endpoint.url}: {version.get('Browser', 'up')}")
+            return True
+        except Exception as e:
+            print(f"🩺 {endpoint.url} is not answering: {e}")
+            return False
+
+    async def _connect(self, endpoint):
+        if not await self.health_check(endpoint):
+            return False
+        try:
+            endpoint.browser = await self.playwright.chromium.connect_over_cdp(endpoint.url)
+        except Exception as e:
+            print(f"⚠️ Could not connect to {endpoint.url}: {e}")
+            return False
+        # the default context is the one with the extension loaded
+        endpoint.context = endpoint.browser.contexts[0] if endpoint.browser.contexts else await endpoint.browser.new_context()
+        return True
+
+    async def start(self):
+        """Connect every endpoint; the ones that fail are retried later by ensure_connected."""
+        await asyncio.gather(*(self._connect(e) for e in self.endpoints))
+        live = self.live_endpoints()
+        if not live:
+            raise RuntimeError(f"No CDP endpoint reachable: {', '.join(e.url for e in self.endpoints)}")
+        print(f"🌐 Browser pool: {len(live)}/{len(self.endpoints)} endpoints up")
+        return live
+
+    async def ensure_connected(self, endpoint, attempts=RECONNECT_ATTEMPTS):
+        """Reconnect `endpoint` if it dropped. Marks it dead after `attempts` failures."""
+        async with endpoint.lock:  # several workers share an endpoint; only one reconnects
+            if endpoint.dead:
+                return False
+            if endpoint.connected:
+                return True
+
+            delay = RECONNECT_BACKOFF
+            for attempt in range(1, attempts + 1):
+                if self.fleet is not None:
+                    await self.fleet.revive(endpoint.url)
+                if await self._connect(endpoint):
+                    if endpoint.reconnects or attempt > 1:
+                        print(f"🔌 Reconnected to {endpoint.url}")
+                    endpoint.reconnects += 1
+                    return True
+                if attempt < attempts:
+                    await asyncio.sleep(delay)
+                    delay *= 2
+
+            endpoint.dead = True
+            print(f"💀 Giving up on {endpoint.url}; its work moves to the other endpoints")
+            return False
+
+    async def new_page(self, endpoint):
+        if not await self.ensure_connected(endpoint):
+            return None
+        return await endpoint.context.new_page()
+
+    def live_endpoints(self):
+        return [e for e in self.endpoints if not e.dead and e.connected]
+
+    async def close(self):
+        # connect_over_cdp browsers are shared with whoever started Chrome; only drop our connection
+        for endpoint in self.endpoints:
+            if endpoint.connected:
+                await endpoint.browser.close()
@@ -0,0 +1,247 @@
+import asyncio
+import atexit
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+# Chromium instances started and stopped by the scraper itself, instead of a
+# Chrome + Scrap.io someone launched by hand on port 9014.
+# Every instance gets its own persistent profile (chrome_profiles/instance_<n>, so
+# the extension's login / settings survive between runs) with the unpacked Scrap.io
+# extension loaded, and its own remote debugging port. The fleet's CDP endpoints
+# are handed to BrowserPool exactly like --cdp ones. An instance only counts as up
+# once the extension's background worker is running, so the first goto already
+# gets the Scrap.io overlay. How many instances fit is worked out from the CPUs and
+# free memory unless a number is given.
+#
+#   python Scrap_Data_FinalScript.py --fleet --extension ~/scrapio-extension
+#   python Scrap_Data_FinalScript.py --fleet 3 --workers 2
+
+FLEET_BASE_PORT = int(os.environ.get("FLEET_BASE_PORT", 9014))
+FLEET_PROFILE_DIR = os.environ.get("FLEET_PROFILE_DIR", "chrome_profiles")
+CHROME_PATH = os.environ.get("CHROME_PATH")  # default: Playwright's Chromium (branded Chrome ignores --load-extension)
+EXTENSION_DIR = os.environ.get("SCRAPIO_EXTENSION_DIR")  # unpacked Scrap.io extension
+
+# What one instance needs, for sizing the fleet to the machine
+CPUS_PER_INSTANCE = float(os.environ.get("FLEET_CPUS_PER_INSTANCE", 1.5))
+MEM_PER_INSTANCE_MB = int(os.environ.get("FLEET_MEM_PER_INSTANCE_MB", 400))  # browser + extension
+MEM_PER_TAB_MB = int(os.environ.get("FLEET_MEM_PER_TAB_MB", 350))            # one Maps tab
+
+STARTUP_TIMEOUT = 30  # seconds until the debugging port answers
+WARMUP_TIMEOUT = 30   # seconds until the extension's background worker is up
+SHUTDOWN_TIMEOUT = 10  # seconds between SIGTERM and SIGKILL
+
+CHROME_ARGS = [
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-dev-shm-usage",
+    # background tabs must keep running at full speed
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+]
+
+
+def available_memory_mb():
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def fleet_size(requested=None, tabs_per_instance=1):
+    """Instances the machine can carry; `requested` (if any) is capped to that."""
+    by_cpu = int((os.cpu_count() or 1) // CPUS_PER_INSTANCE)
+    memory = available_memory_mb()
+    by_memory = memory // (MEM_PER_INSTANCE_MB + MEM_PER_TAB_MB * tabs_per_instance) if memory is not None else by_cpu
+    fits = max(1, min(by_cpu, by_memory))
+    if requested and requested > fits:
+        print(f"⚠️ {requested} browsers requested, but {os.cpu_count()} CPUs / {memory} MB free "
+              f"only fit {fits} with {tabs_per_instance} tabs each")
+    return min(requested, fits) if requested else fits
+
+
+def _port_in_use(port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        return s.connect_ex(("127.0.0.1", port)) == 0
+
+
+def _get_json(url):
+    with urllib.request.urlopen(url, timeout=2) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+class ChromeInstance:
+    def __init__(self, index, port, user_data_dir):
+        self.index = index
+        self.port = port
+        self.user_data_dir = user_data_dir
+        self.process = None
+        self.restarts = 0
+
+    @property
+    def url(self):
+        return f"http://localhost:{self.port}"
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def __repr__(self):
+        return f"ChromeInstance({self.index}, {self.url!r}, {'running' if self.running else 'stopped'})"
+
+
+class ChromeFleet:
+    def __init__(self, size, extension_dir=EXTENSION_DIR, chrome_path=CHROME_PATH, headless=True,
+                 base_port=FLEET_BASE_PORT, profile_dir=FLEET_PROFILE_DIR):
+        self.size = size
+        self.extension_dir = os.path.abspath(os.path.expanduser(extension_dir)) if extension_dir else None
+        self.chrome_path = chrome_path
+        self.headless = headless
+        self.base_port = base_port
+        self.profile_dir = profile_dir
+        self.instances = []
+        self._atexit_registered = False
+
+    def _command(self, instance):
+        command = [self.chrome_path, f"--remote-debugging-port={instance.port}",
+                   f"--user-data-dir={os.path.abspath(instance.user_data_dir)}"] + CHROME_ARGS
+        if self.extension_dir:
+            command += [f"--disable-extensions-except={self.extension_dir}", f"--load-extension={self.extension_dir}"]
+        if self.headless:
+            command.append("--headless=new")  # the new headless mode runs extensions
+        return command + ["about:blank"]
+
+    def _free_ports(self, count):
+        ports, port = [], self.base_port
+        while len(ports) < count:
+            if not _port_in_use(port):
+                ports.append(port)
+            port += 1
+        return ports
+
+    def _launch(self, instance):
+        os.makedirs(instance.user_data_dir, exist_ok=True)
+        # own session: a Ctrl+C in the terminal reaches us, and we shut the browsers down in order
+        instance.process = subprocess.Popen(self._command(instance), stdout=subprocess.DEVNULL,
+                                            stderr=subprocess.DEVNULL, start_new_session=True)
+
+    def _wait_until_ready(self, instance):
+        """Block until the debugging port answers and the extension (if any) has a background target."""
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            if not instance.running:
+                raise RuntimeError(f"Chromium {instance.index} exited with code {instance.process.returncode}")
+            try:
+                _get_json(f"{instance.url}/json/version")
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Chromium {instance.index} did not open port {instance.port} "
+                                       f"within {STARTUP_TIMEOUT}s")
+                time.sleep(0.25)
+
+        if not self.extension_dir:
+            return
+        deadline = time.monotonic() + WARMUP_TIMEOUT
+        while time.monotonic() < deadline:
+            targets = _get_json(f"{instance.url}/json/list")
+            if any(t.get("url", "").startswith("chrome-extension://")
+                   and t.get("type") in ("service_worker", "background_page") for t in targets):
+                return
+            time.sleep(0.25)
+        raise RuntimeError(f"Scrap.io did not start in Chromium {instance.index} within {WARMUP_TIMEOUT}s")
+
+    async def _start_instance(self, instance):
+        self._launch(instance)
+        try:
+            await asyncio.to_thread(self._wait_until_ready, instance)
+        except RuntimeError:
+            self._terminate(instance)
+            raise
+
+    async def start(self, default_chrome_path=None):
+        """Launch and warm up every instance. Returns the CDP endpoints of the ones that came up."""
+        self.chrome_path = self.chrome_path or default_chrome_path
+        if not self.chrome_path or not (shutil.which(self.chrome_path) or os.path.exists(self.chrome_path)):
+            raise RuntimeError(f"No Chromium at {self.chrome_path!r}: set CHROME_PATH or run `playwright install chromium`")
+        if not self.extension_dir:
+            print("⚠️ No Scrap.io extension given (--extension / SCRAPIO_EXTENSION_DIR): browsers start without it")
+        elif not os.path.exists(os.path.join(self.extension_dir, "manifest.json")):
+            raise RuntimeError(f"{self.extension_dir} is not an unpacked extension (no manifest.json)")
+
+        self.instances = [
+            ChromeInstance(i, port, os.path.join(self.profile_dir, f"instance_{i}"))
+            for i, port in enumerate(self._free_ports(self.size), 1)
+        ]
+        if not self._atexit_registered:
+            atexit.register(self.stop)
+            # a plain SIGTERM would skip atexit and leave the browsers behind
+            if signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+                signal.signal(signal.SIGTERM, lambda *_: sys.exit(143))
+            self._atexit_registered = True
+
+        started = time.monotonic()
+        print(f"🚀 Starting {self.size} Chromium instances on ports {self.instances[0].port}+...")
+        results = await asyncio.gather(*(self._start_instance(i) for i in self.instances), return_exceptions=True)
+        for instance, result in zip(self.instances, results):
+            if isinstance(result, Exception):
+                print(f"⚠️ {result}")
+        up = [instance for instance in self.instances if instance.running]
+        if not up:
+            raise RuntimeError("No Chromium instance of the fleet came up")
+        print(f"🔥 {len(up)}/{self.size} browsers up and warmed in {time.monotonic() - started:.1f}s")
+        return [instance.url for instance in up]
+
+    async def revive(self, url):
+        """Relaunch the instance behind `url` if its process died. False if it isn't ours or won't come back."""
+        instance = next((i for i in self.instances if i.url == url), None)
+        if instance is None:
+            return False
+        if instance.running:
+            return True
+        instance.restarts += 1
+        print(f"♻️ Chromium {instance.index} exited ({instance.process.returncode}); restarting it")
+        try:
+            await self._start_instance(instance)
+            return True
+        except RuntimeError as e:
+            print(f"⚠️ {e}")
+            return False
+
+    def _terminate(self, instance):
+        if not instance.running:
+            return
+        instance.process.terminate()  # lets Chrome flush the profile
+        try:
+            instance.process.wait(SHUTDOWN_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            instance.process.kill()
+            instance.process.wait()
+
+    def stop(self):
+        running = [instance for instance in self.instances if instance.running]
+        for instance in running:
+            instance.process.terminate()
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        for instance in running:
+            try:
+                instance.process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                instance.process.kill()
+                instance.process.wait()
+        if running:
+            print(f"🛑 Stopped {len(running)} Chromium instances")
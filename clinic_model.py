@@ -0,0 +1,116 @@
+import hashlib
+from collections import defaultdict
+from typing import NamedTuple
+
+from dedupe_index import place_id_from_url, name_address_key, normalize_text
+from extraction import group_scrapio
+
+# Output data model.
+# Every clinic is one row in a clinics table plus one row per contact value in a
+# long contacts table (clinic_id, type, value), so nothing is padded and the two
+# tables can be deduplicated and joined afterwards. clinic_id is derived from the
+# same place identity the dedupe index uses, so it is stable across states and runs.
+# The old wide layout (a clinic spread over as many rows as its longest contact
+# list, blanks everywhere else) is derived from the tables for the .xlsx deliverable.
+
+# Contact types, in wide-layout column order
+CONTACT_COLUMNS = [
+    "Phone", "Email", "Website", "Facebook", "Instagram",
+    "Contact Page", "YouTube", "Twitter", "LinkedIn",
+]
+OUTPUT_COLUMNS = ["Clinic Name", "Address", "Sponsored"] + CONTACT_COLUMNS  # wide layout
+
+CLINIC_TABLE_COLUMNS = ["clinic_id", "name", "address", "sponsored", "place_url"]
+CONTACT_TABLE_COLUMNS = ["clinic_id", "type", "value"]
+
+
+def clinic_id_for(name, address, href=""):
+    identity = place_id_from_url(href) or name_address_key(name, address) or normalize_text(name)
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:16]
+
+
+def build_rows(base_row, contacts):
+    """
+    Expand one clinic into as many rows as its longest contact list.
+    Clinic info goes on the first row only; `contacts` maps column -> values.
+    """
+    max_len = max([len(values) for values in contacts.values()] + [1])
+
+    rows = []
+    for j in range(max_len):
+        row = {}
+        if j == 0:
+            row.update(base_row)  # include clinic info
+        else:
+            row["Clinic Name"] = ""
+            row["Address"] = ""
+            row["Sponsored"] = ""
+
+        for column in CONTACT_COLUMNS:
+            values = contacts.get(column, [])
+            row[column] = values[j] if j < len(values) else ""
+
+        rows.append(row)
+    return rows
+
+
+class Clinic(NamedTuple):
+    clinic_id: str
+    name: str
+    address: str
+    sponsored: str
+    place_url: str
+    contacts: tuple  # ((type, value), ...)
+
+    @classmethod
+    def from_record(cls, record):
+        """From an extraction record (list view or detail pane)."""
+        grouped = group_scrapio(record["scrapio"])
+        contacts = tuple((column, value) for column in CONTACT_COLUMNS for value in grouped[column] if value)
+        href = record.get("href") or ""
+        return cls(clinic_id_for(record["name"], record["address"], href),
+                   record["name"], record["address"], record["sponsored"] or "", href, contacts)
+
+    @classmethod
+    def from_wide_rows(cls, rows):
+        """From the padded rows older runs journaled for a clinic."""
+        first = rows[0]
+        contacts = tuple((column, row[column]) for column in CONTACT_COLUMNS for row in rows if row.get(column))
+        return cls(clinic_id_for(first["Clinic Name"], first["Address"]),
+                   first["Clinic Name"], first["Address"], first["Sponsored"] or "", "", contacts)
+
+    def to_json(self):
+        """Compact form for the progress journal."""
+        return [self.clinic_id, self.name, self.address, self.sponsored, self.place_url, [list(c) for c in self.contacts]]
+
+    @classmethod
+    def from_json(cls, data):
+        if data and isinstance(data[0], dict):
+            return cls.from_wide_rows(data)
+        clinic_id, name, address, sponsored, place_url, contacts = data
+        return cls(clinic_id, name, address, sponsored, place_url, tuple(tuple(c) for c in contacts))
+
+    def clinic_row(self):
+        return {"clinic_id": self.clinic_id, "name": self.name, "address": self.address,
+                "sponsored": self.sponsored, "place_url": self.place_url}
+
+    def contact_rows(self):
+        return [{"clinic_id": self.clinic_id, "type": t, "value": v} for t, v in self.contacts]
+
+    def wide_rows(self):
+        grouped = defaultdict(list)
+        for t, v in self.contacts:
+            grouped[t].append(v)
+        base_row = {"Clinic Name": self.name, "Address": self.address, "Sponsored": self.sponsored}
+        return build_rows(base_row, grouped)
+
+
+def wide_rows_from_tables(clinic_rows, contact_rows):
+    """Padded wide rows from clinics / contacts table rows (dicts), in clinics-table order."""
+    contacts = defaultdict(list)
+    for row in contact_rows:
+        contacts[row["clinic_id"]].append((row["type"], row["value"]))
+    for row in clinic_rows:
+        clinic = Clinic(row["clinic_id"], row["name"], row["address"], row["sponsored"], row["place_url"],
+                        tuple(contacts.get(row["clinic_id"], ())))
+        yield from clinic.wide_rows()
@@ -0,0 +1,193 @@
+import argparse
+import glob
+import os
+import re
+import sqlite3
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from clinic_model import Clinic, CLINIC_TABLE_COLUMNS, CONTACT_TABLE_COLUMNS, wide_rows_from_tables
+from contact_normalize import normalize_contacts, NORMALIZED_COLUMNS
+from dedupe_index import name_address_key, normalize_text
+from sinks import open_sink, read_sink_output, write_wide
+
+# One national dataset from the per-state (per-shard) outputs.
+# Every shard's files are loaded in a process pool: the normalized clinics /
+# contacts tables this scraper writes now, or the wide csv / parquet / sqlite /
+# xlsx files of older runs. They are merged in shard order with cross-state
+# dedupe (same clinic_id, same normalized name + address, or same name + E.164
+# phone: the first shard wins) and written as national clinics / contacts
+# tables, parquet by default. Contacts go through contact_normalize as one batch
+# first, so the phone key doesn't depend on how each listing formatted it.
+# The wide .xlsx deliverable is optional and streamed, so it doesn't need the
+# whole sheet in memory.
+#
+#   python consolidate.py --input-dir . --out national --excel national.xlsx
+
+OUTPUT_NAME_RE = re.compile(
+    r"^scrapio_clinics_(?P<shard>.+?)(?:_(?P<table>clinics|contacts))?\.(?P<ext>csv|parquet|sqlite|xlsx)$"
+)
+
+# Which output of a shard to read when there are several (the .xlsx is usually derived)
+FORMAT_PREFERENCE = ["parquet", "sqlite", "csv", "xlsx"]
+
+NATIONAL_CLINIC_COLUMNS = CLINIC_TABLE_COLUMNS + ["state"]
+
+
+def discover_outputs(input_dir):
+    """shard id -> {"format", "clinics", "contacts"} (contacts None for wide files), one entry per shard."""
+    found = defaultdict(dict)  # shard -> ext -> {table: path}
+    for path in glob.glob(os.path.join(input_dir, "scrapio_clinics_*")):
+        match = OUTPUT_NAME_RE.match(os.path.basename(path))
+        if match:
+            found[match["shard"]].setdefault(match["ext"], {})[match["table"] or "wide"] = path
+
+    outputs = {}
+    for shard, by_ext in found.items():
+        for ext in FORMAT_PREFERENCE:
+            tables = by_ext.get(ext, {})
+            if "clinics" in tables and "contacts" in tables:
+                outputs[shard] = {"format": ext, "clinics": tables["clinics"], "contacts": tables["contacts"]}
+                break
+            if "wide" in tables:
+                if ext == "sqlite" and _sqlite_is_normalized(tables["wide"]):
+                    outputs[shard] = {"format": ext, "clinics": tables["wide"], "contacts": tables["wide"]}
+                else:
+                    outputs[shard] = {"format": ext, "clinics": tables["wide"], "contacts": None}
+                break
+    return outputs
+
+
+def _sqlite_is_normalized(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contacts'").fetchone() is not None
+    finally:
+        conn.close()
+
+
+def _read(path, table):
+    if path.endswith(".xlsx"):
+        return pd.read_excel(path, dtype=str, keep_default_na=False)
+    return read_sink_output(path, table)
+
+
+def load_shard(shard, output):
+    """Clinics of one shard, in file order."""
+    if output["contacts"] is not None:
+        contacts = defaultdict(list)
+        for row in _read(output["contacts"], "contacts").fillna("").itertuples(index=False):
+            contacts[row.clinic_id].append((row.type, row.value))
+        return shard, [
+            Clinic(row.clinic_id, row.name, row.address, row.sponsored or "", row.place_url or "",
+                   tuple(contacts.get(row.clinic_id, ())))
+            for row in _read(output["clinics"], "clinics").fillna("").itertuples(index=False)
+        ]
+
+    # wide layout: a clinic starts on a row with a name, continuation rows have none
+    clinics, rows = [], []
+    for row in _read(output["clinics"], "clinics").fillna("").to_dict("records"):
+        if row.get("Clinic Name") and rows:
+            clinics.append(Clinic.from_wide_rows(rows))
+            rows = []
+        rows.append(row)
+    if rows and rows[0].get("Clinic Name"):
+        clinics.append(Clinic.from_wide_rows(rows))
+    return shard, clinics
+
+
+def state_of(shard):
+    """Shard ids are "<State>", "<State>__<city>" or "<State>__tile<path>", spaces as underscores."""
+    return shard.split("__")[0].replace("_", " ")
+
+
+def consolidate(input_dir=".", out_base="national", output_format="parquet", excel_path=None, workers=None,
+                normalize=True):
+    started = time.monotonic()
+    outputs = discover_outputs(input_dir)
+    if not outputs:
+        print(f"⚠️ No scrapio_clinics_* outputs found in {input_dir}")
+        return None
+    print(f"🧩 Loading {len(outputs)} shard outputs with {workers or os.cpu_count()} processes...")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        loaded = dict(pool.map(load_shard, outputs.keys(), outputs.values()))
+    print(f"⏱️ Loaded in {time.monotonic() - started:.1f}s")
+
+    # Shard order decides which state keeps a clinic seen in several
+    seen_ids, candidates = set(), []
+    for shard in sorted(loaded):
+        state = state_of(shard)
+        for clinic in loaded[shard]:
+            if clinic.clinic_id not in seen_ids:
+                seen_ids.add(clinic.clinic_id)
+                candidates.append((state, clinic))
+    duplicates = sum(len(clinics) for clinics in loaded.values()) - len(candidates)
+
+    contacts = pd.DataFrame([row for _, clinic in candidates for row in clinic.contact_rows()],
+                            columns=CONTACT_TABLE_COLUMNS)
+    contact_columns = CONTACT_TABLE_COLUMNS
+    phones = {}
+    if normalize:
+        normalize_started = time.monotonic()
+        contacts = normalize_contacts(contacts)
+        contact_columns = NORMALIZED_COLUMNS
+        valid_phones = contacts[(contacts["type"] == "Phone") & (contacts["issue"] == "")]
+        phones = valid_phones.groupby("clinic_id")["value"].agg(list).to_dict()
+        print(f"🧹 {len(contacts)} contacts normalized in {time.monotonic() - normalize_started:.1f}s, "
+              f"{(contacts['issue'] != '').sum()} flagged")
+
+    seen_keys = set()
+    kept = []
+    for state, clinic in candidates:
+        name = normalize_text(clinic.name)
+        keys = [name_address_key(clinic.name, clinic.address)]
+        if name:
+            keys += [(name, phone) for phone in phones.get(clinic.clinic_id, ())]
+        keys = [key for key in keys if key]
+        if any(key in seen_keys for key in keys):
+            duplicates += 1
+            continue
+        seen_keys.update(keys)
+        kept.append((state, clinic))
+    contacts = contacts[contacts["clinic_id"].isin({clinic.clinic_id for _, clinic in kept})]
+
+    clinics_sink = open_sink(output_format, f"{out_base}_clinics", NATIONAL_CLINIC_COLUMNS, batch_size=50000)
+    table = {"table": "contacts"} if output_format == "sqlite" else {}  # SqliteSink defaults to "clinics"
+    contacts_sink = open_sink(output_format, f"{out_base}_contacts", contact_columns, batch_size=50000, **table)
+    with clinics_sink, contacts_sink:
+        clinics_sink.write_rows([dict(clinic.clinic_row(), state=state) for state, clinic in kept])
+        contacts_sink.write_rows(contacts.to_dict("records"))
+
+    print(f"🎉 {len(kept)} clinics ({duplicates} cross-state duplicates dropped), "
+          f"{contacts_sink.rows_written} contacts -> {clinics_sink.path}, {contacts_sink.path}")
+
+    if excel_path:
+        # the deliverable only gets the contacts that passed validation
+        usable = contacts[contacts["issue"] == ""] if normalize else contacts
+        write_wide(wide_rows_from_tables((clinic.clinic_row() for _, clinic in kept), usable.to_dict("records")),
+                   excel_path)
+        print(f"📁 Wide deliverable saved to {excel_path}")
+
+    print(f"⏱️ Consolidated in {time.monotonic() - started:.1f}s")
+    return clinics_sink.path, contacts_sink.path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge per-state scraper outputs into one national dataset")
+    parser.add_argument("--input-dir", default=".", help="where the scrapio_clinics_* files are")
+    parser.add_argument("--out", default="national", help="base name of the national tables")
+    parser.add_argument("--format", default="parquet", choices=["parquet", "csv", "sqlite"])
+    parser.add_argument("--excel", help="also write the wide .xlsx (or .csv) deliverable here")
+    parser.add_argument("--workers", type=int, help="processes to use (default: one per CPU)")
+    parser.add_argument("--raw-contacts", action="store_true", help="keep contacts as scraped (no normalization)")
+    args = parser.parse_args()
+
+    consolidate(args.input_dir, args.out, args.format, args.excel, args.workers, normalize=not args.raw_contacts)
+
+
+if __name__ == "__main__":
+    main()
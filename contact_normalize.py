@@ -0,0 +1,199 @@
+import argparse
+import random
+import time
+
+import pandas as pd
+
+# Contact normalization, on whole contacts tables at once.
+# Works on the long (clinic_id, type, value) table with pandas string operations,
+# one pass per contact type, never a Python loop per row:
+#   Phone        -> E.164 (+15551234567), US numbers without a country code get +1
+#   Email        -> lower-cased, mailto:/query/percent-encoding stripped
+#   Website etc. -> the link as given, minus fragment and tracking params (http:// when it had no scheme)
+# Every row also gets a `key`: the canonical form duplicates are detected on. For links
+# that is https://host/path with no www./m. and no trailing / (which would break sites
+# that only serve http or only www, so it is never written as the value).
+# Every row keeps its raw value and gets an `issue` ("" when the value is fine).
+# Duplicates (same key) collapse to one row per clinic.
+#
+#   python contact_normalize.py national_contacts.parquet national_contacts_clean.parquet
+#   python contact_normalize.py --benchmark 1000000
+
+DEFAULT_COUNTRY_CODE = "1"
+
+URL_TYPES = ["Website", "Contact Page", "Facebook", "Instagram", "YouTube", "Twitter", "LinkedIn"]
+
+# Hosts a social link must be on to count as valid
+SOCIAL_HOSTS = {
+    "Facebook": r"(?:facebook\.com|fb\.com|fb\.me)",
+    "Instagram": r"instagram\.com",
+    "YouTube": r"(?:youtube\.com|youtu\.be)",
+    "Twitter": r"(?:twitter\.com|x\.com)",
+    "LinkedIn": r"linkedin\.com",
+}
+
+# A whole tracking parameter, anchored at a parameter boundary so "pref=" or "shl=" survive
+TRACKING_PARAM_RE = r"(?:^|&)(?:utm_[a-z_]+|fbclid|gclid|mc_[a-z]+|ref|hl)(?:=[^&]*)?(?=&|$)"
+EMAIL_RE = r"^[a-z0-9._%+'-]+@[a-z0-9.-]+\.[a-z]{2,}$"
+E164_RE = r"^\+[1-9]\d{7,14}$"
+# scrapers pick up retina image names like logo@2x.png as "emails"
+FAKE_EMAIL_RE = r"\.(?:png|jpe?g|gif|webp|svg)$|@(?:example|domain|sentry)\."
+
+NORMALIZED_COLUMNS = ["clinic_id", "type", "value", "key", "raw", "issue"]
+
+
+def normalize_phones(values):
+    raw = values.fillna("").astype(str)
+    # extensions (x12, ext. 12, ;ext=12) aren't part of an E.164 number
+    s = raw.str.replace(r"(?i)^tel:", "", regex=True).str.replace(r"(?i)\s*(?:x|ext\.?|;ext=)\s*\d+$", "", regex=True)
+    plus = s.str.strip().str.startswith("+")
+    digits = s.str.replace(r"\D", "", regex=True)
+
+    out = pd.Series("", index=values.index)
+    out[plus] = "+" + digits[plus]
+    national = ~plus & (digits.str.len() == 10)
+    out[national] = "+" + DEFAULT_COUNTRY_CODE + digits[national]
+    trunk = ~plus & (digits.str.len() == 11) & digits.str.startswith(DEFAULT_COUNTRY_CODE)
+    out[trunk] = "+" + digits[trunk]
+    international = ~plus & digits.str.startswith("00")
+    out[international] = "+" + digits[international].str[2:]
+
+    issue = pd.Series("", index=values.index)
+    issue[~out.str.match(E164_RE)] = "bad_phone"
+    # NANP: area code and exchange can't start with 0 or 1
+    nanp = out.str.startswith("+1") & out.str.len().eq(12)
+    issue[nanp & ~out.str.match(r"^\+1[2-9]\d{2}[2-9]\d{6}$")] = "bad_phone"
+    out[issue != ""] = digits[issue != ""]
+    return out, issue
+
+
+def normalize_emails(values):
+    s = values.fillna("").astype(str).str.strip()
+    s = s.str.replace(r"(?i)^mailto:", "", regex=True).str.replace(r"\?.*$", "", regex=True)
+    s = s.str.replace("%40", "@", regex=False).str.replace("%20", "", regex=False).str.strip().str.lower()
+
+    issue = pd.Series("", index=values.index)
+    issue[~s.str.match(EMAIL_RE)] = "bad_email"
+    issue[s.str.contains(FAKE_EMAIL_RE, regex=True)] = "bad_email"
+    return s, issue
+
+
+def normalize_urls(values, types):
+    s = values.fillna("").astype(str).str.strip()
+    parts = s.str.extract(r"^(?:(?P<scheme>[a-zA-Z][a-zA-Z0-9+.-]*):)?(?://)?(?P<host>[^/?#]*)(?P<path>[^?#]*)(?:\?(?P<query>[^#]*))?")
+    parts = parts.fillna("")
+
+    scheme = parts["scheme"].str.lower()
+    full_host = parts["host"].str.lower().str.rstrip(".")
+    host = full_host.str.replace(r"^(?:www\d*|m|mobile|web)\.", "", regex=True)
+    host = host.str.replace(r":(?:80|443)$", "", regex=True)
+    query = parts["query"].str.replace(TRACKING_PARAM_RE, "", regex=True).str.strip("&")
+    has_query = query != ""
+
+    # the link as the clinic publishes it; http:// for bare domains, since it reaches both kinds of site
+    out = scheme.where(scheme != "", "http") + "://" + full_host + parts["path"]
+    out[has_query] = out[has_query] + "?" + query[has_query]
+
+    key = "https://" + host + parts["path"].str.replace(r"/+$", "", regex=True)
+    key[has_query] = key[has_query] + "?" + query[has_query]
+
+    issue = pd.Series("", index=values.index)
+    issue[~scheme.isin(["", "http", "https"]) | ~host.str.contains(r"^[a-z0-9-]+(?:\.[a-z0-9-]+)+(?::\d+)?$", regex=True)] = "bad_url"
+    for contact_type, pattern in SOCIAL_HOSTS.items():
+        wrong_site = (types == contact_type) & ~host.str.match(rf"^(?:[a-z0-9-]+\.)*{pattern}$")
+        issue[wrong_site & (issue == "")] = "not_" + contact_type.lower()
+    bad = issue == "bad_url"
+    out[bad] = s[bad]
+    key[bad] = s[bad]
+    return out, key, issue
+
+
+def normalize_contacts(contacts):
+    """
+    Normalize a (clinic_id, type, value) DataFrame. Returns NORMALIZED_COLUMNS with `raw`
+    holding the original value and duplicates (same clinic, type and key) dropped.
+    """
+    df = contacts[["clinic_id", "type", "value"]].copy()
+    df["raw"] = df["value"]
+    df["issue"] = ""
+
+    phones = df["type"] == "Phone"
+    if phones.any():
+        df.loc[phones, "value"], df.loc[phones, "issue"] = normalize_phones(df.loc[phones, "raw"])
+
+    emails = df["type"] == "Email"
+    if emails.any():
+        df.loc[emails, "value"], df.loc[emails, "issue"] = normalize_emails(df.loc[emails, "raw"])
+
+    urls = df["type"].isin(URL_TYPES)
+    if urls.any():
+        df.loc[urls, "value"], df.loc[urls, "key"], df.loc[urls, "issue"] = normalize_urls(
+            df.loc[urls, "raw"], df.loc[urls, "type"])
+
+    # phones and emails are their own canonical form
+    df["key"] = df["key"].fillna(df["value"]) if "key" in df else df["value"]
+    empty = df["value"] == ""
+    df.loc[empty, "issue"] = "empty"
+    return df.drop_duplicates(["clinic_id", "type", "key"]).reset_index(drop=True)[NORMALIZED_COLUMNS]
+
+
+# ---- benchmark ----
+
+SAMPLE_VALUES = {
+    "Phone": ["tel:+1 (555) 201-3344", "555.201.3344", "+44 20 7946 0958", "1-800-FLOWERS", "tel:5552013344 x12", "12345"],
+    "Email": ["mailto:Info@Smile.com", "INFO@smile.com?subject=hi", "office%40smile.com", "logo@2x.png", "nope"],
+    "Website": ["https://www.Smile.com/", "smile.com/?utm_source=gmb", "http://m.smile.com/contact#top", "not a url"],
+    "Facebook": ["https://m.facebook.com/smiledental/?ref=page", "facebook.com/smiledental", "https://smile.com/fb"],
+    "Instagram": ["https://www.instagram.com/smile/"],
+}
+
+
+def synthetic_contacts(n, seed=0):
+    rng = random.Random(seed)
+    types = list(SAMPLE_VALUES)
+    rows = []
+    for i in range(n):
+        contact_type = rng.choice(types)
+        rows.append((f"{i // 4:016x}", contact_type, rng.choice(SAMPLE_VALUES[contact_type])))
+    return pd.DataFrame(rows, columns=["clinic_id", "type", "value"])
+
+
+def benchmark(sizes=(10_000, 100_000, 1_000_000)):
+    print(f"{'rows':>10}{'seconds':>10}{'rows/s':>14}{'kept':>10}{'issues':>10}")
+    for n in sizes:
+        df = synthetic_contacts(n)
+        started = time.perf_counter()
+        out = normalize_contacts(df)
+        elapsed = time.perf_counter() - started
+        print(f"{n:>10}{elapsed:>10.2f}{n / elapsed:>14,.0f}{len(out):>10}{(out['issue'] != '').sum():>10}")
+
+
+def main():
+    from sinks import read_sink_output, open_sink
+
+    parser = argparse.ArgumentParser(description="Normalize and validate a contacts table")
+    parser.add_argument("input", nargs="?", help="contacts table (.csv / .parquet / .sqlite)")
+    parser.add_argument("output", nargs="?", help="where to write the normalized table (same formats)")
+    parser.add_argument("--benchmark", type=int, nargs="*", help="time the stage on synthetic tables of these sizes")
+    args = parser.parse_args()
+
+    if args.benchmark is not None:
+        benchmark(args.benchmark or (10_000, 100_000, 1_000_000))
+        return
+    if not args.input or not args.output:
+        parser.error("input and output are required unless --benchmark is given")
+
+    started = time.perf_counter()
+    df = normalize_contacts(read_sink_output(args.input, "contacts").fillna(""))
+    base, ext = args.output.rsplit(".", 1)
+    table = {"table": "contacts"} if ext == "sqlite" else {}
+    with open_sink(ext, base, NORMALIZED_COLUMNS, batch_size=len(df) + 1, **table) as sink:
+        sink.write_rows(df.to_dict("records"))
+    issues = df["issue"].value_counts().drop("", errors="ignore")
+    print(f"🧹 {len(df)} contacts normalized in {time.perf_counter() - started:.1f}s -> {sink.path}")
+    for issue, n in issues.items():
+        print(f"   {issue}: {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import re
+import sqlite3
+import time
+import unicodedata
+from urllib.parse import unquote, urlparse
+
+# Persistent cross-state dedupe index.
+# Every clinic we write is registered under its Google Maps place identity
+# (taken from the hfpxzc link) and, as a fallback, under a normalized
+# name + address key. A place belongs to the first state that wrote it;
+# other states skip it before paying for the detail click.
+
+DEFAULT_DEDUPE_DB = "dedupe_index.db"
+
+# .../data=!4m7!3m6!1s0x89c259a61c75684f:0x79d31adb123348d2!8m2!3d40.7!4d-73.9!16s...
+FEATURE_ID_RE = re.compile(r"!1s(0x[0-9a-f]+:0x[0-9a-f]+)", re.IGNORECASE)
+# ...!19sChIJ...
+PLACE_ID_RE = re.compile(r"!19s([A-Za-z0-9_-]+)")
+
+
+def place_id_from_url(url):
+    """Place identity from a Maps place URL: the feature id, the ChIJ place id, or the bare place path."""
+    if not url:
+        return ""
+    url = unquote(url)
+    match = FEATURE_ID_RE.search(url)
+    if match:
+        return match.group(1).lower()
+    match = PLACE_ID_RE.search(url)
+    if match:
+        return match.group(1)
+    path = urlparse(url).path
+    return path.split("/data=")[0].rstrip("/") if "/maps/place/" in path else ""
+
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    text = re.sub(r"[^a-z0-9]+", " ", text.lower())
+    return " ".join(text.split())
+
+
+def name_address_key(name, address):
+    """Fallback identity; only usable when we have both a name and an address."""
+    name, address = normalize_text(name), normalize_text(address)
+    return f"{name}|{address}" if name and address else ""
+
+
+class DedupeIndex:
+    def __init__(self, path=DEFAULT_DEDUPE_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS places ("
+            " place_id TEXT,"
+            " name_key TEXT,"
+            " state TEXT NOT NULL,"
+            " first_seen REAL NOT NULL,"
+            " last_seen REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS places_place_id ON places(place_id) WHERE place_id != ''")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS places_name_key ON places(name_key) WHERE name_key != ''")
+        self.conn.commit()
+        self.stats = {}  # state -> {"checked": n, "hits": n}
+
+    def owner(self, record):
+        """State that already owns this clinic, or None. `record` has href / name / address."""
+        place_id = place_id_from_url(record.get("href"))
+        if place_id:
+            row = self.conn.execute("SELECT state FROM places WHERE place_id = ?", (place_id,)).fetchone()
+            if row:
+                return row[0]
+        name_key = name_address_key(record.get("name"), record.get("address"))
+        if name_key:
+            row = self.conn.execute("SELECT state FROM places WHERE name_key = ?", (name_key,)).fetchone()
+            if row:
+                return row[0]
+        return None
+
+    def is_duplicate(self, record, state):
+        """True if another state already has this clinic. Counts towards the state's hit rate."""
+        state_stats = self.stats.setdefault(state, {"checked": 0, "hits": 0})
+        state_stats["checked"] += 1
+        owner = self.owner(record)
+        if owner is not None and owner != state:
+            state_stats["hits"] += 1
+            return True
+        return False
+
+    def add(self, record, state):
+        place_id = place_id_from_url(record.get("href"))
+        name_key = name_address_key(record.get("name"), record.get("address"))
+        if not place_id and not name_key:
+            return
+        now = time.time()
+        updated = self.conn.execute(
+            "UPDATE places SET last_seen = ?, name_key = COALESCE(NULLIF(?, ''), name_key) "
+            "WHERE (place_id = ? AND place_id != '') OR (name_key = ? AND name_key != '')",
+            (now, name_key, place_id, name_key),
+        ).rowcount
+        if not updated:
+            self.conn.execute(
+                "INSERT INTO places (place_id, name_key, state, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)",
+                (place_id, name_key, state, now, now),
+            )
+        self.conn.commit()
+
+    def hit_rate(self, state):
+        state_stats = self.stats.get(state, {"checked": 0, "hits": 0})
+        checked = state_stats["checked"]
+        return state_stats["hits"], checked, (state_stats["hits"] / checked if checked else 0.0)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,186 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from dedupe_index import place_id_from_url, normalize_text
+
+# Persistent cache of detail-pane records, keyed by Google Maps place identity.
+# A refresh run still scrolls every search (so new and removed places show up),
+# but only opens the detail pane for places that are new, whose cache entry is
+# older than the TTL, or whose card now shows a different name / address than
+# when the pane was read. Everything else reuses the cached record.
+# Entries carry a fingerprint of the extracted content, so a refresh can tell
+# changed clinics from ones that were re-read for nothing. The cache is bounded:
+# past max_entries the least recently used places are dropped.
+#
+#   python Scrap_Data_FinalScript.py --fresh --detail-cache
+#   python detail_cache.py stats
+#   python detail_cache.py purge        # drop expired entries
+
+DEFAULT_DETAIL_CACHE_DB = "detail_cache.db"
+DETAIL_CACHE_TTL_DAYS = float(os.environ.get("DETAIL_CACHE_TTL_DAYS", 7))
+DETAIL_CACHE_MAX_ENTRIES = int(os.environ.get("DETAIL_CACHE_MAX_ENTRIES", 500000))
+EVICT_EVERY = 1000  # puts between size checks
+
+
+def content_fingerprint(record):
+    """What the clinic looks like to us: name, address and Scrap.io items, order-insensitive."""
+    items = sorted((item.get("type") or "", item.get("href") or "") for item in record["scrapio"])
+    content = [normalize_text(record["name"]), normalize_text(record["address"]), items]
+    return hashlib.sha1(json.dumps(content).encode("utf-8")).hexdigest()
+
+
+def card_fingerprint(list_record):
+    """What the result card showed; a change means the cached pane is out of date."""
+    content = [normalize_text(list_record["name"]), normalize_text(list_record["address"])]
+    return hashlib.sha1(json.dumps(content).encode("utf-8")).hexdigest()
+
+
+class DetailCache:
+    def __init__(self, path=DEFAULT_DETAIL_CACHE_DB, ttl_days=DETAIL_CACHE_TTL_DAYS,
+                 max_entries=DETAIL_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS details ("
+            " place_id TEXT PRIMARY KEY,"
+            " record TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " card_fingerprint TEXT NOT NULL,"
+            " scraped_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS details_last_used ON details(last_used)")
+        self.conn.commit()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "card_changed": 0,
+                      "stored": 0, "changed": 0, "unchanged": 0, "evicted": 0}
+        self._puts = 0
+
+    def get(self, list_record):
+        """The cached detail record for this card, or None if it has to be scraped again."""
+        place_id = place_id_from_url(list_record.get("href"))
+        if not place_id:
+            return None
+        row = self.conn.execute(
+            "SELECT record, card_fingerprint, scraped_at FROM details WHERE place_id = ?", (place_id,)
+        ).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        record, card, scraped_at = row
+        if time.time() - scraped_at > self.ttl:
+            self.stats["expired"] += 1
+            return None
+        if card != card_fingerprint(list_record):
+            self.stats["card_changed"] += 1
+            return None
+
+        self.conn.execute("UPDATE details SET last_used = ? WHERE place_id = ?", (time.time(), place_id))
+        self.conn.commit()
+        self.stats["hits"] += 1
+        record = json.loads(record)
+        record["href"] = list_record["href"]
+        record["sponsored"] = list_record["sponsored"]  # ad placement belongs to this search, not the place
+        return record
+
+    def put(self, list_record, record):
+        """Store a freshly scraped detail record. Returns "new", "changed" or "unchanged"."""
+        place_id = place_id_from_url(list_record.get("href"))
+        if not place_id:
+            return None
+        fingerprint = content_fingerprint(record)
+        previous = self.conn.execute("SELECT fingerprint FROM details WHERE place_id = ?", (place_id,)).fetchone()
+        now = time.time()
+        stored = {k: v for k, v in record.items() if k != "html"}
+        self.conn.execute(
+            "INSERT OR REPLACE INTO details (place_id, record, fingerprint, card_fingerprint, scraped_at, last_used)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (place_id, json.dumps(stored), fingerprint, card_fingerprint(list_record), now, now),
+        )
+        self.conn.commit()
+        self.stats["stored"] += 1
+
+        self._puts += 1
+        if self._puts % EVICT_EVERY == 0:
+            self.evict()
+
+        if previous is None:
+            return "new"
+        status = "unchanged" if previous[0] == fingerprint else "changed"
+        self.stats[status] += 1
+        return status
+
+    def evict(self):
+        """Drop the least recently used entries beyond max_entries. Returns how many went."""
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM details").fetchone()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return 0
+        self.conn.execute(
+            "DELETE FROM details WHERE place_id IN (SELECT place_id FROM details ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self.conn.commit()
+        self.stats["evicted"] += excess
+        return excess
+
+    def purge_expired(self):
+        cur = self.conn.execute("DELETE FROM details WHERE scraped_at < ?", (time.time() - self.ttl,))
+        self.conn.commit()
+        return cur.rowcount
+
+    def summary(self):
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM details").fetchone()
+        (expired,) = self.conn.execute(
+            "SELECT COUNT(*) FROM details WHERE scraped_at < ?", (time.time() - self.ttl,)
+        ).fetchone()
+        oldest, newest = self.conn.execute("SELECT MIN(scraped_at), MAX(scraped_at) FROM details").fetchone()
+        return {"entries": count, "expired": expired, "oldest": oldest, "newest": newest}
+
+    def print_summary(self):
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["expired"] + self.stats["card_changed"]
+        if not lookups:
+            return
+        print(f"🗄️ Detail cache: {self.stats['hits']}/{lookups} panes reused ({self.stats['hits'] / lookups:.0%}), "
+              f"{self.stats['misses']} new, {self.stats['expired']} expired, {self.stats['card_changed']} card changed; "
+              f"of the re-read ones {self.stats['changed']} changed, {self.stats['unchanged']} unchanged")
+
+    def close(self):
+        self.evict()
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or trim the per-place detail cache")
+    parser.add_argument("--db", default=DEFAULT_DETAIL_CACHE_DB)
+    parser.add_argument("--ttl-days", type=float, default=DETAIL_CACHE_TTL_DAYS)
+    parser.add_argument("command", choices=["stats", "purge", "clear"])
+    args = parser.parse_args()
+
+    cache = DetailCache(args.db, args.ttl_days)
+    try:
+        if args.command == "stats":
+            summary = cache.summary()
+            print(f"🗄️ {args.db}: {summary['entries']} places, {summary['expired']} older than {args.ttl_days:g} days")
+            if summary["entries"]:
+                fmt = "%Y-%m-%d %H:%M"
+                print(f"   scraped between {time.strftime(fmt, time.localtime(summary['oldest']))} "
+                      f"and {time.strftime(fmt, time.localtime(summary['newest']))}")
+        elif args.command == "purge":
+            print(f"🧹 {cache.purge_expired()} expired entries removed")
+        else:
+            cache.conn.execute("DELETE FROM details")
+            cache.conn.commit()
+            print("🧹 Detail cache cleared")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
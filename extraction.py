@@ -0,0 +1,274 @@
+import os
+import re
+
+# Detail pane extraction.
+# A clinic record looks like:
+#   {"name": str, "address": str, "sponsored": str,
+#    "scrapio": [{"type": "<data-type>", "href": "<href or None>"}, ...]}
+
+DETAIL_NAME_XPATH = "//h1[contains(@class,'DUwDvf')]"
+DETAIL_ADDRESS_XPATH = "(//*[@class='Io6YTe fontBodyMedium kR99db fdkmkc '])[1]"
+SPONSORED_XPATH = "//span[contains(text(),'Sponsored')]"
+SCRAPIO_ROWS_XPATH = (
+    "//*[@class='m6QErb DxyBCb kA9KIf dS8AEf XiKgde ']"
+    "//*[@class='scrapio-card-main__body']//*[@class='scrapio-card-main__rows']/div"
+)
+
+# Scrap.io data-type -> output column. phone* types are matched by prefix.
+SCRAPIO_COLUMNS = {
+    "emails": "Email",
+    "phone": "Phone",
+    "website": "Website",
+    "facebook": "Facebook",
+    "instagram": "Instagram",
+    "contact_pages": "Contact Page",
+    "youtube": "YouTube",
+    "twitter": "Twitter",
+    "linkedin": "LinkedIn",
+}
+
+# A card's info line only has the street part of the address ("Dentist · 123 Main St");
+# the pane has the full one. Phone numbers and opening hours on the card also carry
+# digits, so a street segment needs a digit, a letter, and no hours wording.
+STREET_SEGMENT_RE = re.compile(r"^(?=.*\d)(?=.*[A-Za-z])(?!.*\b(?:Open|Opens|Closed|Closes|AM|PM)\b)", re.IGNORECASE)
+
+# A full US address ends in ", ST 12345": only then is a card's address as good as the pane's
+FULL_ADDRESS_RE = re.compile(r",\s*[A-Z]{2}\s+\d{5}(?:-\d{4})?\s*(?:,|$)")
+
+# Contacts a card must already show before hybrid mode skips its detail pane
+HYBRID_REQUIRED_CONTACTS = [
+    c.strip() for c in os.environ.get("HYBRID_REQUIRED_CONTACTS", "Phone,Email,Website").split(",") if c.strip()
+]
+
+# Whole detail pane in one round-trip.
+# With `withHtml` the record also carries the pane's outerHTML (for the snapshot archive).
+DETAIL_EXTRACT_JS = """
+([nameXPath, addressXPath, sponsoredXPath, rowsXPath, withHtml]) => {
+    const first = (xp) => document.evaluate(
+        xp, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    const text = (el) => el ? el.innerText : "";
+
+    const rows = document.evaluate(
+        rowsXPath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const scrapio = [];
+    for (let i = 0; i < rows.snapshotLength; i++) {
+        const row = rows.snapshotItem(i);
+        const a = row.querySelector("a");
+        scrapio.push({
+            type: row.getAttribute("data-type"),
+            href: a ? a.getAttribute("href") : null,
+        });
+    }
+
+    const heading = first(nameXPath);
+    const record = {
+        name: text(heading),
+        address: text(first(addressXPath)),
+        sponsored: text(first(sponsoredXPath)),
+        scrapio: scrapio,
+    };
+    if (withHtml) {
+        let pane = heading;
+        while (pane && !(pane.classList.contains("DxyBCb") && pane.classList.contains("XiKgde"))) {
+            pane = pane.parentElement;
+        }
+        record.html = (pane || document.body).outerHTML;
+    }
+    return record;
+}
+"""
+
+
+
+async def extract_detail(page, with_html=False):
+    """Read the open detail pane with a single page.evaluate call."""
+    return await page.evaluate(
+        DETAIL_EXTRACT_JS,
+        [DETAIL_NAME_XPATH, DETAIL_ADDRESS_XPATH, SPONSORED_XPATH, SCRAPIO_ROWS_XPATH, with_html],
+    )
+
+
+async def extract_detail_legacy(page, with_html=False):
+    """Same record as extract_detail, built from one query per field (many CDP round-trips)."""
+    record = {"name": "", "address": "", "sponsored": "", "scrapio": []}
+    handles = []  # disposed at the end so long runs don't pile up remote objects
+
+    try:
+        try:
+            el = await page.query_selector(f"xpath={DETAIL_NAME_XPATH}")
+            handles.append(el)
+            record["name"] = await el.inner_text()
+        except:
+            pass
+
+        try:
+            el = await page.query_selector(DETAIL_ADDRESS_XPATH)
+            handles.append(el)
+            record["address"] = await el.inner_text()
+        except:
+            pass
+
+        try:
+            el = await page.query_selector(f"xpath={SPONSORED_XPATH}")
+            handles.append(el)
+            record["sponsored"] = await el.inner_text() if el else ""
+        except:
+            pass
+
+        for item in await page.query_selector_all(f"xpath={SCRAPIO_ROWS_XPATH}"):
+            handles.append(item)
+            dtype = await item.get_attribute("data-type")
+            a_tag = await item.query_selector("a")
+            handles.append(a_tag)
+            href = await a_tag.get_attribute("href") if a_tag else None
+            record["scrapio"].append({"type": dtype, "href": href})
+    finally:
+        for handle in handles:
+            if handle is not None:
+                try:
+                    await handle.dispose()
+                except Exception:
+                    pass  # the page may have navigated away already
+
+    if with_html:
+        record["html"] = (await extract_detail(page, with_html=True)).get("html", "")
+    return record
+
+
+def legacy_call_count(record):
+    """CDP round-trips extract_detail_legacy made for `record`: 2 per field, 1 list query, 3 per row."""
+    return 7 + 3 * len(record["scrapio"]) + ("html" in record)
+
+
+def scrapio_column(dtype):
+    """Output column for a Scrap.io data-type, or None if we don't keep it."""
+    if not dtype:
+        return None
+    if dtype.startswith("phone"):
+        return "Phone"
+    return SCRAPIO_COLUMNS.get(dtype)
+
+
+def clean_scrapio_value(column, href):
+    if column == "Email":
+        return href.replace("mailto:", "") if href else ""
+    if column == "Phone":
+        return href.replace("tel:", "") if href else ""
+    return href
+
+
+def group_scrapio(items):
+    """Group Scrap.io {type, href} items into a list of values per output column."""
+    grouped = {column: [] for column in SCRAPIO_COLUMNS.values()}
+    for item in items:
+        column = scrapio_column(item.get("type"))
+        if column:
+            grouped[column].append(clean_scrapio_value(column, item.get("href")))
+    return grouped
+
+
+def merge_detail(list_record, record):
+    """Detail pane record, filled in from the list view where the pane came back empty."""
+    record["name"] = record["name"] or list_record["name"]
+    record["address"] = record["address"] or list_record["address"]
+    record["scrapio"] = record["scrapio"] or list_record["scrapio"]
+    record["href"] = list_record["href"]
+    return record
+
+
+# Every result card in the feed in one round-trip.
+# Cards are keyed off the hfpxzc anchors so the list order matches
+# (//*[@class='hfpxzc'])[n]. Scrap.io puts its social items in the
+# siblings that follow the card's bfdHYd block. With `indexes` only the cards
+# at those feed positions are read (to pick up Scrap.io items added late).
+LIST_EXTRACT_JS = """
+([start, withHtml, indexes]) => {
+    const clean = (s) => (s || "").replace(/[\\u2066-\\u2069]/g, "").trim();
+    const records = [];
+
+    const all = Array.from(document.querySelectorAll("div[role=feed] a.hfpxzc"));
+    const positions = indexes
+        ? indexes.filter((i) => i < all.length)
+        : all.map((_, i) => i).slice(start);
+    for (const index of positions) {
+        const anchor = all[index];
+        // walk up to the element that holds this card's body
+        let card = anchor.parentElement;
+        while (card && !card.querySelector(".bfdHYd") && card.getAttribute("role") !== "feed") {
+            card = card.parentElement;
+        }
+        const body = card ? card.querySelector(".bfdHYd") : null;
+        const heading = body ? body.querySelector(".qBF1Pd") : null;
+
+        // address: trailing "·" segment of the first info line that looks like a street
+        // (STREET_SEGMENT_RE: not a phone number or opening hours)
+        let address = "";
+        if (body) {
+            for (const line of body.querySelectorAll(".W4Efsd")) {
+                if (line.querySelector(".W4Efsd")) continue;
+                const parts = line.innerText.split("·");
+                const last = clean(parts[parts.length - 1]);
+                if (parts.length > 1 && /^(?=.*\\d)(?=.*[A-Za-z])(?!.*\\b(?:Open|Opens|Closed|Closes|AM|PM)\\b)/i.test(last)) {
+                    address = last;
+                    break;
+                }
+            }
+        }
+
+        const scrapio = [];
+        for (let sib = body ? body.nextElementSibling : null; sib; sib = sib.nextElementSibling) {
+            for (const item of sib.querySelectorAll(".scrapio-icon-detail.scrapio-card-social__item")) {
+                scrapio.push({
+                    type: item.getAttribute("data-type"),
+                    href: item.getAttribute("data-url"),
+                });
+            }
+        }
+
+        const record = {
+            name: clean(heading ? heading.innerText : anchor.getAttribute("aria-label")),
+            address: address,
+            sponsored: card && card.innerText.includes("Sponsored") ? "Sponsored" : "",
+            href: anchor.getAttribute("href") || "",
+            scrapio: scrapio,
+            index: index,  // position in the feed, 0-based
+        };
+        if (withHtml) {
+            record.html = (card && card.getAttribute("role") !== "feed" ? card : anchor.parentElement).outerHTML;
+        }
+        records.push(record);
+    }
+    return records;
+}
+"""
+
+
+async def extract_list(page, start=0, with_html=False, indexes=None):
+    """
+    Harvest the cards in the feed (name, address, sponsored, place link, Scrap.io items,
+    feed position). `start` skips cards already harvested, since the feed only ever appends;
+    `indexes` reads just the cards at those positions instead.
+    With `with_html` every record also carries its card's outerHTML.
+    """
+    return await page.evaluate(LIST_EXTRACT_JS, [start, with_html, list(indexes) if indexes is not None else None])
+
+
+def address_is_complete(address):
+    return bool(FULL_ADDRESS_RE.search(address or ""))
+
+
+def needs_detail(record):
+    """
+    A list record can skip the detail pane only when it is as good as the pane: a full
+    address (cards usually show just the street, and the pane's address is the one we
+    write) and every contact type in HYBRID_REQUIRED_CONTACTS.
+    """
+    if not address_is_complete(record.get("address")):
+        return True
+    types = {scrapio_column(item.get("type")) for item in record.get("scrapio") or []}
+    return not set(HYBRID_REQUIRED_CONTACTS) <= types
+
+
+def clinic_key(record):
+    """Stable key for a clinic within a search: its place link, or its name if there is no link."""
+    return record.get("href") or record.get("name") or ""
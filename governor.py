@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+# Adaptive request pacing shared by every worker and tab.
+# Requests are spaced to the current rate; the rate creeps up additively while
+# Google answers normally and is cut multiplicatively (AIMD) on throttle signals:
+#   - a consent / "unusual traffic" (/sorry/) page
+#   - a run of empty detail panes
+#   - load latency climbing well above its running baseline
+# Block pages also pause everyone for a cooldown that doubles while they keep coming.
+
+BLOCK_URL_MARKERS = ("consent.google.", "/sorry/", "google.com/sorry")
+BLOCK_TEXT_MARKERS = ("unusual traffic", "not a robot", "Before you continue to Google")
+
+
+class ThrottleDetected(Exception):
+    """Google showed a consent or unusual-traffic page instead of results."""
+
+
+class RateGovernor:
+    def __init__(self, start_rate=1.0, min_rate=0.05, max_rate=4.0, increase=0.05, decrease=0.5,
+                 empty_run=3, latency_factor=3.0, block_cooldown=60, max_cooldown=900, metrics=None):
+        self.rate = start_rate          # requests per second, across all workers
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.empty_run = empty_run
+        self.latency_factor = latency_factor
+        self.block_cooldown = block_cooldown
+        self.max_cooldown = max_cooldown
+        self.metrics = metrics
+
+        self.lock = asyncio.Lock()
+        self.next_slot = 0.0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.consecutive_empty = 0
+        self.consecutive_blocks = 0
+        self.fast_latency = None   # EWMA over the last few requests
+        self.slow_latency = None   # EWMA baseline
+        self.samples = 0
+
+    async def acquire(self):
+        """Wait for this worker's turn at the current rate (and for any cooldown to end)."""
+        async with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_slot, self.paused_until)
+            self.next_slot = start + 1 / self.rate
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def _decrease(self, reason):
+        now = time.monotonic()
+        # one throttle episode should only cut the rate once
+        if now - self.last_decrease < 1 / self.rate * 3:
+            return
+        self.last_decrease = now
+        old = self.rate
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        print(f"🐢 Throttle signal ({reason}): rate {old:.2f} -> {self.rate:.2f} req/s")
+        if self.metrics is not None:
+            self.metrics.count("throttle_events")
+
+    def report(self, latency_ms=None, empty=False):
+        """Feed back the outcome of one request."""
+        if empty:
+            self.consecutive_empty += 1
+            if self.consecutive_empty >= self.empty_run:
+                self.consecutive_empty = 0
+                self._decrease(f"{self.empty_run} empty detail panes in a row")
+            return
+
+        self.consecutive_empty = 0
+        self.consecutive_blocks = 0
+
+        if latency_ms is not None:
+            self.samples += 1
+            self.fast_latency = latency_ms if self.fast_latency is None else 0.3 * latency_ms + 0.7 * self.fast_latency
+            self.slow_latency = latency_ms if self.slow_latency is None else 0.02 * latency_ms + 0.98 * self.slow_latency
+            if self.samples > 20 and self.fast_latency > self.slow_latency * self.latency_factor:
+                self._decrease(f"latency {self.fast_latency:.0f} ms vs {self.slow_latency:.0f} ms baseline")
+                return
+
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def report_block(self, url):
+        self.consecutive_blocks += 1
+        cooldown = min(self.max_cooldown, self.block_cooldown * 2 ** (self.consecutive_blocks - 1))
+        self.paused_until = max(self.paused_until, time.monotonic() + cooldown)
+        self.last_decrease = 0.0  # a block always cuts the rate
+        self._decrease(f"block page {url}")
+        print(f"⛔ Pausing all workers for {cooldown}s")
+        if self.metrics is not None:
+            self.metrics.count("block_pages")
+
+    async def is_blocked(self, page):
+        """True (and backs off) if `page` is a consent or unusual-traffic page."""
+        url = page.url or ""
+        blocked = any(marker in url for marker in BLOCK_URL_MARKERS)
+        if not blocked:
+            try:
+                text = await page.evaluate("document.body ? document.body.innerText.slice(0, 2000) : ''")
+            except Exception:
+                text = ""
+            blocked = any(marker in text for marker in BLOCK_TEXT_MARKERS)
+        if blocked:
+            self.report_block(url)
+        return blocked
@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from playwright.async_api import async_playwright
+
+import sharding
+import Scrap_Data_FinalScript as scraper
+from chrome_fleet import EXTENSION_DIR
+from metrics import percentile, RunMetrics
+from resource_policy import ResourcePolicy
+from snapshot_archive import SnapshotArchive
+
+# Record / replay one scrape_state session, for offline regression and timing runs.
+#
+# record: scrapes one state in a browser launched here, saving all of its traffic
+#         to a HAR archive (and every card / detail pane to a snapshot archive, see
+#         snapshot_archive.py) plus a <har>.json sidecar with the session's timings.
+# replay: runs the same scrape in a local headless Chromium with the HAR served
+#         through Playwright's HAR routing: no network, same Maps responses every
+#         time. Requests the archive doesn't have are aborted. Timings are compared
+#         against the recording and, with --compare, an earlier replay.
+#
+#   python har_replay.py record Wyoming --extension ~/scrapio-extension
+#   python har_replay.py replay recordings/Wyoming.har.zip --json after.json --compare before.json
+#
+# Scrap.io is an extension, not page traffic: replays have no Scrap.io items, so they
+# don't wait for them either (SCRAPIO_CARD_WAIT / SCRAPIO_ROW_WAIT are set to 0) and
+# run in the scrape / extraction / detail modes the recording was made with.
+# The contacts side is compared offline from the snapshots (snapshot_archive.py).
+
+DEFAULT_RECORDINGS_DIR = "recordings"
+
+
+def sidecar_path(har_path):
+    return har_path + ".json"
+
+
+def summarize(stats, elapsed):
+    clinic_ms = stats["clinic_ms"]
+    return {
+        "clinics": stats["processed"],
+        "found": stats["found"],
+        "seconds": round(elapsed, 2),
+        "clinics_per_min": round(stats["processed"] / elapsed * 60, 1) if elapsed else 0.0,
+        "first_record_s": round(stats["first_record_s"] or 0, 2),
+        "p50_ms": round(percentile(clinic_ms, 50), 1),
+        "p90_ms": round(percentile(clinic_ms, 90), 1),
+        "p99_ms": round(percentile(clinic_ms, 99), 1),
+        "mean_ms": round(statistics.mean(clinic_ms), 1) if clinic_ms else 0.0,
+    }
+
+
+async def _scrape(page, state, services, verbose):
+    out = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    started = time.monotonic()
+    with out:
+        stats = await scraper.scrape_state(page, state, services, sharding.state_shard(state))
+    return summarize(stats, time.monotonic() - started)
+
+
+async def record(state, har_path=None, snapshot_dir=None, extension_dir=EXTENSION_DIR, user_data_dir=None,
+                 headless=False, verbose=True):
+    """Scrape `state` once with the traffic going to `har_path`. Returns the sidecar dict."""
+    har_path = har_path or os.path.join(DEFAULT_RECORDINGS_DIR, f"{state.replace(' ', '_')}.har.zip")
+    snapshot_dir = snapshot_dir or os.path.join(os.path.dirname(har_path) or ".", "snapshots")
+    os.makedirs(os.path.dirname(har_path) or ".", exist_ok=True)
+
+    args = []
+    if extension_dir:
+        extension_dir = os.path.abspath(os.path.expanduser(extension_dir))
+        args = [f"--disable-extensions-except={extension_dir}", f"--load-extension={extension_dir}"]
+    else:
+        print("⚠️ No Scrap.io extension given (--extension / SCRAPIO_EXTENSION_DIR): recording Maps only")
+
+    snapshots = SnapshotArchive(snapshot_dir)
+    resources = ResourcePolicy(enabled=scraper.BLOCK_RESOURCES)
+    services = scraper.RunServices(resources=resources, metrics=RunMetrics(log_path=None), snapshots=snapshots)
+
+    print(f"🎙️ Recording {state} to {har_path}...")
+    with tempfile.TemporaryDirectory() as scratch:
+        async with async_playwright() as p:
+            # extensions need a persistent context; the HAR is written when it closes
+            context = await p.chromium.launch_persistent_context(
+                user_data_dir or os.path.join(scratch, "profile"), headless=headless, args=args,
+                record_har_path=har_path,
+            )
+            try:
+                page = context.pages[0] if context.pages else await context.new_page()
+                await resources.attach(page)
+                summary = await _scrape(page, state, services, verbose)
+            finally:
+                snapshots.close()
+                await context.close()
+
+    sidecar = {
+        "state": state,
+        "har": os.path.basename(har_path),
+        "snapshots": snapshots.path_for(state),
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "modes": {"scrape": scraper.SCRAPE_MODE, "extraction": scraper.EXTRACTION_MODE, "detail": scraper.DETAIL_MODE},
+        "recorded": summary,
+    }
+    with open(sidecar_path(har_path), "w", encoding="utf-8") as f:
+        json.dump(sidecar, f, indent=2)
+    print(f"📁 {summary['clinics']} clinics recorded in {summary['seconds']}s -> {har_path}, {sidecar['snapshots']}")
+    return sidecar
+
+
+async def replay(har_path, state=None, repeat=1, verbose=False):
+    """Re-run the recorded scrape `repeat` times against the HAR. Returns one summary per run."""
+    sidecar = {}
+    if os.path.exists(sidecar_path(har_path)):
+        with open(sidecar_path(har_path), encoding="utf-8") as f:
+            sidecar = json.load(f)
+    state = state or sidecar.get("state")
+    if not state:
+        raise ValueError(f"No state given and no {sidecar_path(har_path)} to read it from")
+
+    # scraped files of the replay are thrown away
+    scraper.EXPORT_EXCEL = False
+    # nothing would ever fill these in, so waiting for them only times the timeouts
+    scraper.SCRAPIO_CARD_WAIT = 0
+    scraper.SCRAPIO_ROW_WAIT = 0
+    modes = sidecar.get("modes", {})
+    scraper.SCRAPE_MODE = modes.get("scrape", scraper.SCRAPE_MODE)
+    scraper.EXTRACTION_MODE = modes.get("extraction", scraper.EXTRACTION_MODE)
+    scraper.DETAIL_MODE = modes.get("detail", scraper.DETAIL_MODE)
+    if modes:
+        print(f"🎛️ Replaying with the recorded modes: scrape={scraper.SCRAPE_MODE}, "
+              f"extraction={scraper.EXTRACTION_MODE}, detail={scraper.DETAIL_MODE}")
+    runs = []
+    cwd = os.getcwd()
+    har_path = os.path.abspath(har_path)
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            async with async_playwright() as p:
+                browser = await p.chromium.launch()
+                for i in range(repeat):
+                    # a fresh context per run, so nothing is served from the previous run's cache
+                    context = await browser.new_context()
+                    await context.route_from_har(har_path, not_found="abort")
+                    page = await context.new_page()
+                    print(f"▶️ Replaying {state} ({i + 1}/{repeat})...")
+                    runs.append(await _scrape(page, state, scraper.RunServices(), verbose))
+                    await context.close()
+                await browser.close()
+        finally:
+            os.chdir(cwd)
+    return sidecar, runs
+
+
+COMPARE_KEYS = ["clinics", "seconds", "clinics_per_min", "first_record_s", "p50_ms", "p90_ms", "p99_ms"]
+
+
+def median_run(runs):
+    return {key: round(statistics.median(run[key] for run in runs), 2) for key in COMPARE_KEYS}
+
+
+def print_comparison(columns):
+    """columns: [(label, summary)], the first one is the reference the others are compared with."""
+    print(f"\n{'':<16}" + "".join(f"{label:>16}" for label, _ in columns))
+    reference = columns[0][1]
+    for key in COMPARE_KEYS:
+        cells = []
+        for _, summary in columns:
+            value = summary.get(key)
+            if value is None:
+                cells.append(f"{'-':>16}")
+            elif summary is reference or not reference.get(key):
+                cells.append(f"{value:>16}")
+            else:
+                cells.append(f"{value:>8} ({(value - reference[key]) / reference[key]:+.0%})".rjust(16))
+        print(f"{key:<16}" + "".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a scrape to a HAR archive, or replay one offline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="scrape one state live, saving its traffic and snapshots")
+    rec.add_argument("state")
+    rec.add_argument("--har", help=f"HAR file to write (default {DEFAULT_RECORDINGS_DIR}/<state>.har.zip)")
+    rec.add_argument("--snapshots", help="snapshot directory (default: next to the HAR)")
+    rec.add_argument("--extension", default=EXTENSION_DIR, help="unpacked Scrap.io extension to load")
+    rec.add_argument("--user-data-dir", help="Chrome profile to record with (default: a throwaway one)")
+    rec.add_argument("--headless", action="store_true")
+
+    rep = commands.add_parser("replay", help="re-run a recorded scrape against its HAR, offline")
+    rep.add_argument("har")
+    rep.add_argument("--state", help="defaults to the state in the recording's sidecar")
+    rep.add_argument("--repeat", type=int, default=3, help="runs to take the median of")
+    rep.add_argument("--json", help="write the replay timings to this file")
+    rep.add_argument("--compare", nargs="*", default=[], help="earlier --json outputs to compare against")
+    rep.add_argument("--verbose", action="store_true", help="show the scraper's own output")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        asyncio.run(record(args.state, args.har, args.snapshots, args.extension, args.user_data_dir, args.headless))
+        return
+
+    sidecar, runs = asyncio.run(replay(args.har, args.state, args.repeat, args.verbose))
+    result = median_run(runs)
+    # the first column is the reference: the oldest replay given, else the live recording
+    columns = []
+    for path in args.compare:
+        with open(path, encoding="utf-8") as f:
+            columns.append((os.path.basename(path), json.load(f)["replay"]))
+    if "recorded" in sidecar:
+        columns.append(("recorded", sidecar["recorded"]))
+    columns.append(("replay", result))
+    print_comparison(columns)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"har": args.har, "runs": runs, "replay": result}, f, indent=2)
+        print(f"\n📁 Replay timings saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
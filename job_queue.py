@@ -0,0 +1,367 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import time
+from collections import deque
+
+from sharding import Shard, STATE_BOUNDS, plan_shards, load_cities
+
+# Work queues for states / shards.
+# LocalShardQueue is the in-process queue a single run uses. JobQueue keeps the
+# same jobs in a SQLite file instead, so several scraper processes (on this
+# machine, or on others that share the file over a filesystem with working
+# locks) can pull from it. Its jobs are leased rather than taken: a worker
+# heartbeats while it scrapes, and a job whose lease runs out goes back to the
+# queue. Failed jobs are retried with exponential backoff, up to max_attempts;
+# after that they are dead-lettered until someone requeues them.
+#
+#   python job_queue.py enqueue --shard tiles California Texas
+#   python job_queue.py status
+#   python job_queue.py list --status dead
+#   python job_queue.py requeue --dead
+#   python Scrap_Data_FinalScript.py --queue jobs.db     # in as many processes as you like
+
+DEFAULT_JOBS_DB = "jobs.db"
+
+LEASE_SECONDS = 600
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 30     # seconds before the first retry, doubled every attempt
+BACKOFF_MAX = 3600
+POLL_SECONDS = 5      # how often an idle worker looks for new jobs
+
+
+def shard_to_json(shard):
+    return json.dumps({
+        "state": shard.state, "id": shard.id, "query_url": shard.query_url,
+        "bbox": shard.bbox, "depth": shard.depth,
+    })
+
+
+def shard_from_json(payload, attempts=0):
+    data = json.loads(payload)
+    shard = Shard(data["state"], data["id"], data["query_url"],
+                  tuple(data["bbox"]) if data["bbox"] else None, data["depth"])
+    shard.attempts = attempts
+    return shard
+
+
+class JobQueue:
+    def __init__(self, path=DEFAULT_JOBS_DB, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        # autocommit; lease() opens its own write transaction
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'queued',"  # queued | leased | done | dead
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " max_attempts INTEGER NOT NULL,"
+            " available_at REAL NOT NULL,"
+            " lease_owner TEXT,"
+            " lease_expires REAL,"
+            " last_error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at)")
+
+    def enqueue(self, shards):
+        """Add shards as jobs; ones already in the queue (in any status) are left alone."""
+        now = time.time()
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO jobs (id, payload, max_attempts, available_at, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            [(shard.id, shard_to_json(shard), self.max_attempts, now, now, now) for shard in shards],
+        )
+        return self.conn.total_changes - before
+
+    def lease(self, owner, lease_seconds=LEASE_SECONDS):
+        """Take the next due job for `lease_seconds`. Returns a Shard, or None if nothing is due."""
+        while True:
+            now = time.time()
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT id, payload, attempts, max_attempts FROM jobs"
+                    " WHERE (status = 'queued' AND available_at <= ?)"
+                    "    OR (status = 'leased' AND lease_expires < ?)"  # its worker went away
+                    " ORDER BY available_at, created_at LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row is None:
+                    self.conn.execute("COMMIT")
+                    return None
+
+                job_id, payload, attempts, max_attempts = row
+                if attempts >= max_attempts:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'dead', lease_owner = NULL, updated_at = ?,"
+                        " last_error = COALESCE(last_error, 'lease expired') WHERE id = ?",
+                        (now, job_id),
+                    )
+                    self.conn.execute("COMMIT")
+                    continue
+
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?,"
+                    " attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (owner, now + lease_seconds, now, job_id),
+                )
+                self.conn.execute("COMMIT")
+                return shard_from_json(payload, attempts + 1)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def heartbeat(self, job_id, owner, lease_seconds=LEASE_SECONDS):
+        """Extend a lease. False if it was lost (expired and taken by someone else)."""
+        now = time.time()
+        cur = self.conn.execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ?"
+            " WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (now + lease_seconds, now, job_id, owner),
+        )
+        return cur.rowcount == 1
+
+    def complete(self, job_id, owner):
+        self.conn.execute(
+            "UPDATE jobs SET status = 'done', lease_owner = NULL, last_error = NULL, updated_at = ?"
+            " WHERE id = ? AND lease_owner = ?",
+            (time.time(), job_id, owner),
+        )
+
+    def fail(self, job_id, owner, error):
+        """Back off and requeue the job, or dead-letter it once it is out of attempts. True if requeued."""
+        row = self.conn.execute(
+            "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_owner = ?", (job_id, owner)
+        ).fetchone()
+        if row is None:
+            return True  # the lease was lost; whoever holds it now decides
+        attempts, max_attempts = row
+        now = time.time()
+        if attempts >= max_attempts:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'dead', lease_owner = NULL, last_error = ?, updated_at = ? WHERE id = ?",
+                (str(error), now, job_id),
+            )
+            return False
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1))
+        self.conn.execute(
+            "UPDATE jobs SET status = 'queued', lease_owner = NULL, available_at = ?, last_error = ?,"
+            " updated_at = ? WHERE id = ?",
+            (now + delay, str(error), now, job_id),
+        )
+        return True
+
+    def requeue(self, job_ids=None, status="dead"):
+        """Give jobs (by id, or every job in `status`) a fresh set of attempts. Returns how many."""
+        now = time.time()
+        sql = ("UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, lease_owner = NULL,"
+               " last_error = NULL, updated_at = ?")
+        if job_ids:
+            marks = ",".join("?" * len(job_ids))
+            cur = self.conn.execute(f"{sql} WHERE id IN ({marks})", (now, now, *job_ids))
+        else:
+            cur = self.conn.execute(f"{sql} WHERE status = ?", (now, now, status))
+        return cur.rowcount
+
+    def has_open_work(self):
+        """Anything queued (even if backing off) or leased."""
+        row = self.conn.execute("SELECT 1 FROM jobs WHERE status IN ('queued', 'leased') LIMIT 1").fetchone()
+        return row is not None
+
+    def counts(self):
+        counts = {"queued": 0, "leased": 0, "done": 0, "dead": 0}
+        for status, n in self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = n
+        return counts
+
+    def jobs(self, status=None, limit=100):
+        sql = "SELECT id, status, attempts, max_attempts, available_at, lease_owner, last_error FROM jobs"
+        params = ()
+        if status:
+            sql += " WHERE status = ?"
+            params = (status,)
+        sql += " ORDER BY updated_at DESC LIMIT ?"
+        cols = ["id", "status", "attempts", "max_attempts", "available_at", "lease_owner", "last_error"]
+        return [dict(zip(cols, row)) for row in self.conn.execute(sql, (*params, limit))]
+
+    def reset(self):
+        self.conn.execute("DELETE FROM jobs")
+
+    def close(self):
+        self.conn.close()
+
+
+# ---- what the scraper's workers pull from ----
+
+class LocalShardQueue:
+    """In-memory shard queue for a single run. get() returns None once nothing is left or in flight."""
+
+    def __init__(self, shards=(), max_attempts=MAX_ATTEMPTS):
+        self.queue = deque(shards)
+        self.max_attempts = max_attempts
+        self.in_flight = 0
+        self.changed = asyncio.Condition()
+
+    def pending(self):
+        return len(self.queue)
+
+    async def get(self):
+        async with self.changed:
+            while not self.queue and self.in_flight:
+                await self.changed.wait()  # a running shard may still add tiles or come back
+            if not self.queue:
+                return None
+            self.in_flight += 1
+            return self.queue.popleft()
+
+    async def _finish(self, requeue=None):
+        async with self.changed:
+            if requeue is not None:
+                self.queue.append(requeue)
+            self.in_flight -= 1
+            self.changed.notify_all()
+
+    async def add(self, shards):
+        async with self.changed:
+            self.queue.extend(shards)
+            self.changed.notify_all()
+
+    async def done(self, shard):
+        await self._finish()
+
+    async def retry(self, shard, error):
+        """Put the shard back unless it is out of attempts. True if requeued."""
+        shard.attempts += 1
+        requeue = shard.attempts < self.max_attempts
+        await self._finish(shard if requeue else None)
+        return requeue
+
+    async def fail(self, shard, error):
+        """Errors inside a shard aren't retried in a local run."""
+        await self._finish()
+        return False
+
+
+class SharedShardQueue:
+    """A JobQueue seen from one scraper process: leases jobs and heartbeats them while they run."""
+
+    def __init__(self, jobs, lease_seconds=LEASE_SECONDS, poll_seconds=POLL_SECONDS):
+        self.jobs = jobs
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.heartbeats = {}  # job id -> task
+
+    def pending(self):
+        return self.jobs.counts()["queued"]
+
+    async def get(self):
+        while True:
+            shard = self.jobs.lease(self.owner, self.lease_seconds)
+            if shard is not None:
+                self.heartbeats[shard.id] = asyncio.create_task(self._heartbeat(shard.id))
+                return shard
+            if not self.jobs.has_open_work():
+                return None
+            # jobs are backing off or leased by other workers; they may still come back
+            await asyncio.sleep(self.poll_seconds)
+
+    async def _heartbeat(self, job_id):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self.jobs.heartbeat(job_id, self.owner, self.lease_seconds):
+                print(f"⚠️ Lost the lease on {job_id}; another worker may pick it up")
+                return
+
+    def _stop_heartbeat(self, shard):
+        task = self.heartbeats.pop(shard.id, None)
+        if task is not None:
+            task.cancel()
+
+    async def add(self, shards):
+        self.jobs.enqueue(shards)
+
+    async def done(self, shard):
+        self._stop_heartbeat(shard)
+        self.jobs.complete(shard.id, self.owner)
+
+    async def retry(self, shard, error):
+        self._stop_heartbeat(shard)
+        return self.jobs.fail(shard.id, self.owner, error)
+
+    async def fail(self, shard, error):
+        # another process or a later attempt may well succeed: back off like a retry
+        return await self.retry(shard, error)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and manage the shared scrape job queue")
+    parser.add_argument("--db", default=DEFAULT_JOBS_DB, help=f"job queue file (default: {DEFAULT_JOBS_DB})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="add states (default: all 50) as jobs")
+    enqueue.add_argument("states", nargs="*")
+    enqueue.add_argument("--shard", choices=["state", "cities", "tiles"], default="state")
+    enqueue.add_argument("--cities-file")
+    enqueue.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+
+    commands.add_parser("status", help="job counts per status")
+
+    listing = commands.add_parser("list", help="show jobs")
+    listing.add_argument("--status", choices=["queued", "leased", "done", "dead"])
+    listing.add_argument("--limit", type=int, default=100)
+
+    requeue = commands.add_parser("requeue", help="give jobs a fresh set of attempts")
+    requeue.add_argument("ids", nargs="*")
+    requeue.add_argument("--dead", action="store_true", help="every dead-lettered job")
+    requeue.add_argument("--done", action="store_true", help="every finished job (scrape them again)")
+
+    args = parser.parse_args()
+    jobs = JobQueue(args.db, getattr(args, "max_attempts", MAX_ATTEMPTS))
+    try:
+        if args.command == "enqueue":
+            cities = load_cities(args.cities_file) if args.cities_file else None
+            shards = plan_shards(args.states or list(STATE_BOUNDS), args.shard, cities)
+            added = jobs.enqueue(shards)
+            print(f"📥 {added} jobs added ({len(shards) - added} were already queued)")
+
+        elif args.command == "status":
+            counts = jobs.counts()
+            print("   " + "  ".join(f"{status}: {n}" for status, n in counts.items()))
+
+        elif args.command == "list":
+            for job in jobs.jobs(args.status, args.limit):
+                wait = max(0, job["available_at"] - time.time())
+                line = f"   {job['id']:<40}{job['status']:<8}{job['attempts']}/{job['max_attempts']}"
+                if job["status"] == "queued" and wait:
+                    line += f"  retry in {wait:.0f}s"
+                if job["lease_owner"]:
+                    line += f"  {job['lease_owner']}"
+                if job["last_error"]:
+                    line += f"  ({job['last_error']})"
+                print(line)
+
+        elif args.command == "requeue":
+            if not args.ids and not args.dead and not args.done:
+                parser.error("requeue needs job ids, --dead or --done")
+            n = jobs.requeue(args.ids) if args.ids else 0
+            if args.dead:
+                n += jobs.requeue(status="dead")
+            if args.done:
+                n += jobs.requeue(status="done")
+            print(f"🔁 {n} jobs requeued")
+    finally:
+        jobs.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote_plus
+
+from network_results import (
+    XSSI_PREFIX, PLACE_INDEX, NAME_INDEX, ADDRESS_INDEX, COORDS_INDEX, FEATURE_ID_INDEX, PLACE_ID_INDEX,
+)
+from sharding import MAP_VIEWPORT, TILE_PX
+
+# Local stand-in for Google Maps + the Scrap.io extension, for offline benchmarks.
+# It reproduces only the DOM the scrapers read:
+#   - div[role=feed] with qBF1Pd / hfpxzc cards that lazy-load on scroll
+#   - the bfdHYd card body with its W4Efsd info line and Scrap.io social items
+#   - "You have reached the end of the list." once every result is shown
+#   - the detail pane: h1.DUwDvf, the Io6YTe address and the scrapio-card-main__rows items
+#   - /maps/place/... pages that open straight on a detail pane
+#   - feed pages fetched from /search?tbm=map in the )]}'-prefixed layout network_results.py parses
+# Results are generated from the query, so every run sees the same data. Searches at
+# an @lat,lng,zoom viewpoint (tile shards) get places spread over that map view.
+#
+#   python maps_fixture_server.py --port 8765 --results 300
+#   MAPS_BASE_URL=http://127.0.0.1:8765 python Scrap_Data_FinalScript.py ...
+
+DEFAULT_CONFIG = {
+    "results": 200,            # clinics per search
+    "page_size": 20,           # cards per feed page
+    "feed_latency_ms": 300,    # delay before the next page of cards shows up
+    "detail_latency_ms": 400,  # delay between a card click and its detail pane
+    "scrapio_latency_ms": 150, # extra delay before the Scrap.io rows are attached
+    "list_complete_ratio": 0.6,  # share of cards whose list view has an address + contacts
+    "sponsored_ratio": 0.05,
+}
+
+STREETS = ["Main St", "Oak Ave", "Maple Dr", "Broadway", "Elm St", "2nd St", "Park Ave", "Lake Rd"]
+NAMES = ["Smile", "Bright", "Family", "Gentle", "Downtown", "Riverside", "Sunrise", "Premier", "Valley", "Pearl"]
+KINDS = ["Dental", "Dentistry", "Dental Care", "Dental Clinic", "Orthodontics"]
+
+
+def generate_places(query, config):
+    seed = int(hashlib.sha1(query.encode("utf-8")).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    # whole-US results, or the area on screen for an "... @lat,lng,zoomz" search
+    south, west, north, east = 25, -120, 45, -75
+    view = re.search(r"@(-?[\d.]+),(-?[\d.]+),(\d+)z$", query)
+    if view:
+        lat, lng, zoom = float(view.group(1)), float(view.group(2)), int(view.group(3))
+        half_lng = MAP_VIEWPORT[0] * 360 / (TILE_PX * 2 ** zoom) / 2
+        half_lat = MAP_VIEWPORT[1] * 360 * math.cos(math.radians(lat)) / (TILE_PX * 2 ** zoom) / 2
+        south, west, north, east = lat - half_lat, lng - half_lng, lat + half_lat, lng + half_lng
+    places = []
+    for i in range(config["results"]):
+        name = f"{rng.choice(NAMES)} {rng.choice(KINDS)} {i + 1}"
+        feature_id = f"0x{rng.getrandbits(60):x}:0x{rng.getrandbits(60):x}"
+        lat, lng = south + rng.random() * (north - south), west + rng.random() * (east - west)
+        slug = name.replace(" ", "+")
+        phone = f"+1{rng.randint(200, 999)}{rng.randint(200, 999)}{rng.randint(1000, 9999)}"
+        domain = name.lower().replace(" ", "") + ".com"
+        contacts = [
+            {"type": "phone", "href": f"tel:{phone}"},
+            {"type": "emails", "href": f"mailto:info@{domain}"},
+            {"type": "website", "href": f"https://www.{domain}/"},
+        ]
+        if rng.random() < 0.5:
+            contacts.append({"type": "facebook", "href": f"https://facebook.com/{domain.split('.')[0]}"})
+        if rng.random() < 0.3:
+            contacts.append({"type": "emails", "href": f"office@{domain}"})
+        places.append({
+            "name": name,
+            "address": f"{rng.randint(1, 9999)} {rng.choice(STREETS)}, Springfield, ST {rng.randint(10000, 99999)}",
+            "href": f"/maps/place/{slug}/data=!4m7!3m6!1s{feature_id}!8m2!3d{lat:.7f}!4d{lng:.7f}!16s%2Fg%2F1",
+            "feature_id": feature_id,
+            "place_id": "ChIJ" + hashlib.sha1(feature_id.encode("ascii")).hexdigest()[:23],
+            "lat": lat,
+            "lng": lng,
+            "sponsored": rng.random() < config["sponsored_ratio"],
+            "list_complete": rng.random() < config["list_complete_ratio"],
+            "contacts": contacts,
+        })
+    return places
+
+
+def search_payload(query, places, end):
+    """One page of results laid out like a Maps /search?tbm=map response."""
+    results = []
+    for p in places:
+        place = [None] * (PLACE_ID_INDEX + 1)
+        place[0] = p  # fixture only: what the page renders (the parser never reads [0])
+        place[NAME_INDEX] = p["name"]
+        place[ADDRESS_INDEX] = p["address"]
+        place[COORDS_INDEX] = [None, None, p["lat"], p["lng"]]
+        place[FEATURE_ID_INDEX] = p["feature_id"]
+        place[PLACE_ID_INDEX] = p["place_id"]
+        results.append([None] * PLACE_INDEX + [place])
+    return XSSI_PREFIX + "\n" + json.dumps([[query, results], end])
+
+
+PAGE_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Maps fixture</title>
+<style>
+  body { margin: 0; font-family: sans-serif; display: flex; }
+  div[role=feed] { width: 420px; height: 100vh; overflow-y: auto; }
+  .Nv2PK { position: relative; height: 140px; border-bottom: 1px solid #ddd; padding: 8px; }
+  a.hfpxzc { position: absolute; inset: 0; display: block; z-index: 1; }
+  .scrapio-list { position: relative; z-index: 2; }
+  #pane { flex: 1; padding: 16px; }
+</style></head>
+<body>
+<div role="feed" id="feed"></div>
+<div id="pane"></div>
+<script>
+const CONFIG = __CONFIG__;
+const QUERY = __QUERY__;
+const OPEN_PLACE = __OPEN_PLACE__;
+const feed = document.getElementById("feed");
+const pane = document.getElementById("pane");
+let offset = 0, loading = false, done = false;
+const byHref = {};
+
+function esc(s) { return String(s).replace(/[&<>"]/g, c => ({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[c])); }
+
+function cardHtml(p) {
+  const items = p.list_complete ? p.contacts.map(c =>
+    `<div class="scrapio-icon-detail scrapio-card-social__item" data-type="${c.type}" data-url="${esc(c.href)}"></div>`).join("") : "";
+  // like Maps, the card only shows the street part of the address, and the phone on its own line
+  const phone = p.contacts[0].href.replace("tel:", "");
+  const info = (p.list_complete
+    ? `<div class="W4Efsd"><span>Dentist</span> · <span>\\u2066${esc(p.address.split(",")[0])}\\u2069</span></div>`
+    : `<div class="W4Efsd"><span>Dentist</span></div>`)
+    + `<div class="W4Efsd"><span>Open</span> · <span>${esc(phone)}</span></div>`;
+  return `<div class="Nv2PK">
+    <a class="hfpxzc" aria-label="${esc(p.name)}" href="${esc(p.href)}"></a>
+    <div class="bfdHYd"><div class="qBF1Pd fontHeadlineSmall ">${esc(p.name)}</div>
+      <div class="W4Efsd">${p.sponsored ? "<span>Sponsored</span>" : ""}${info}</div></div>
+    <div class="scrapio-list">${items}</div>
+  </div>`;
+}
+
+function renderDetail(p) {
+  const rows = p.contacts.map(c => `<div data-type="${c.type}"><a href="${esc(c.href)}">${esc(c.href)}</a></div>`).join("");
+  pane.innerHTML = `<div class="m6QErb DxyBCb kA9KIf dS8AEf XiKgde ">
+      <h1 class="DUwDvf lfPIob">${esc(p.name)}</h1>
+      ${p.sponsored ? "<span>Sponsored</span>" : ""}
+      <div class="Io6YTe fontBodyMedium kR99db fdkmkc ">${esc(p.address)}</div>
+      <div class="scrapio-slot"></div>
+    </div>`;
+  setTimeout(() => {
+    const slot = pane.querySelector(".scrapio-slot");
+    if (slot) slot.innerHTML = `<div class="scrapio-card-main__body"><div class="scrapio-card-main__rows">${rows}</div></div>`;
+  }, CONFIG.scrapio_latency_ms);
+}
+
+function loadMore() {
+  if (loading || done) return;
+  loading = true;
+  fetch(`/search?tbm=map&q=${encodeURIComponent(QUERY)}&offset=${offset}`).then(r => r.text()).then(text => {
+    const payload = JSON.parse(text.slice(4));
+    const data = {places: payload[0][1].map(result => result[14][0]), end: payload[1]};
+    setTimeout(() => {
+      for (const p of data.places) {
+        byHref[p.href] = p;
+        feed.insertAdjacentHTML("beforeend", cardHtml(p));
+      }
+      offset += data.places.length;
+      if (data.end) {
+        done = true;
+        feed.insertAdjacentHTML("beforeend", "<div><span>You've reached the end of the list.</span></div>");
+      }
+      loading = false;
+    }, offset === 0 ? 0 : CONFIG.feed_latency_ms);
+  });
+}
+
+feed.addEventListener("scroll", () => {
+  if (feed.scrollTop + feed.clientHeight >= feed.scrollHeight - 200) loadMore();
+});
+
+feed.addEventListener("click", (e) => {
+  const a = e.target.closest("a.hfpxzc");
+  if (!a) return;
+  e.preventDefault();
+  const p = byHref[a.getAttribute("href")];
+  // like Maps, the old pane (and its Scrap.io rows) stays up until the new one is in,
+  // and the URL switches to the place along with it
+  setTimeout(() => { history.replaceState(null, "", p.href); renderDetail(p); }, CONFIG.detail_latency_ms);
+});
+
+if (OPEN_PLACE) setTimeout(() => renderDetail(OPEN_PLACE), CONFIG.detail_latency_ms);
+else loadMore();
+</script>
+</body></html>
+"""
+
+
+class FixtureState:
+    def __init__(self, config):
+        self.config = dict(DEFAULT_CONFIG, **(config or {}))
+        self.places = {}   # query -> places
+        self.by_path = {}  # place href path -> place
+        self.lock = threading.Lock()
+
+    def places_for(self, query):
+        with self.lock:
+            if query not in self.places:
+                self.places[query] = generate_places(query, self.config)
+                for p in self.places[query]:
+                    self.by_path[p["href"].split("/data=")[0]] = p
+            return self.places[query]
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, body, content_type="text/html; charset=utf-8", status=200):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _page(self, query, open_place=None):
+            html = (PAGE_HTML
+                    .replace("__CONFIG__", json.dumps(state.config))
+                    .replace("__QUERY__", json.dumps(query))
+                    .replace("__OPEN_PLACE__", json.dumps(open_place)))
+            self._send(html)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path.startswith("/maps/search/"):
+                segments = url.path[len("/maps/search/"):].split("/")
+                query = unquote_plus(segments[0])
+                if len(segments) > 1 and segments[1].startswith("@"):
+                    query += " " + segments[1]
+                state.places_for(query)
+                return self._page(query)
+
+            if url.path.startswith("/maps/place/"):
+                place = state.by_path.get(url.path.split("/data=")[0])
+                if place is None:
+                    return self._send("unknown place", "text/plain", 404)
+                return self._page("", place)
+
+            if url.path == "/search":
+                params = parse_qs(url.query)
+                query = params.get("q", [""])[0]
+                places = state.places_for(query)
+                offset = int(params.get("offset", ["0"])[0])
+                page = places[offset:offset + state.config["page_size"]]
+                body = search_payload(query, page, offset + len(page) >= len(places))
+                return self._send(body, "application/json; charset=utf-8")
+
+            self._send("not found", "text/plain", 404)
+
+    return Handler
+
+
+def start_fixture_server(port=0, **config):
+    """Start the fixture server in a background thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(FixtureState(config)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Google Maps + Scrap.io fixture server")
+    parser.add_argument("--port", type=int, default=8765)
+    for key, value in DEFAULT_CONFIG.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    config = {key: getattr(args, key) for key in DEFAULT_CONFIG}
+    server, base_url = start_fixture_server(args.port, **config)
+    print(f"🧪 Maps fixture running at {base_url} ({config['results']} results per search)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
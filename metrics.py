@@ -0,0 +1,125 @@
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Hot-path timing for the scraper.
+# Every phase (navigation, scroll, end-of-list wait, click, detail load,
+# extraction, parsing, file write) is timed per state and per clinic, CDP calls
+# and retries are counted, and everything is appended to a JSON Lines log.
+# At the end of a run there is a percentile summary and, optionally, a
+# Prometheus text file (for node_exporter's textfile collector).
+
+DEFAULT_METRICS_LOG = "run_metrics.jsonl"
+DEFAULT_PROMETHEUS_FILE = "run_metrics.prom"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+class RunMetrics:
+    def __init__(self, log_path=DEFAULT_METRICS_LOG, prometheus_path=None):
+        self.log_path = log_path
+        self.prometheus_path = prometheus_path
+        self.log = open(log_path, "a", encoding="utf-8") if log_path else None
+        self.phase_ms = defaultdict(list)   # phase -> durations
+        self.counters = defaultdict(int)    # name -> count
+        self.started = time.time()
+
+    def event(self, kind, **fields):
+        if self.log is not None:
+            self.log.write(json.dumps({"ts": round(time.time(), 3), "event": kind, **fields}) + "\n")
+
+    @contextmanager
+    def phase(self, name, state=None, clinic=None):
+        """Time a block: `with metrics.phase("click", state, clinic): ...` (awaits inside are fine)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000, state, clinic)
+
+    def record(self, name, ms, state=None, clinic=None):
+        self.phase_ms[name].append(ms)
+        fields = {"phase": name, "ms": round(ms, 1)}
+        if state is not None:
+            fields["state"] = state
+        if clinic is not None:
+            fields["clinic"] = clinic
+        self.event("phase", **fields)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def cdp(self, n=1):
+        """Round-trips to the browser."""
+        self.counters["cdp_calls"] += n
+
+    def state_done(self, state, stats):
+        self.count("states")
+        self.count("clinics", stats.get("processed", 0))
+        self.event("state_done", state=state, **{
+            k: v for k, v in stats.items() if k not in ("clinic_ms", "started")
+        })
+        self.flush()
+
+    def summary(self):
+        phases = {}
+        for name, values in self.phase_ms.items():
+            phases[name] = {
+                "count": len(values),
+                "total_s": round(sum(values) / 1000, 1),
+                "p50_ms": round(percentile(values, 50), 1),
+                "p90_ms": round(percentile(values, 90), 1),
+                "p99_ms": round(percentile(values, 99), 1),
+                "max_ms": round(max(values), 1),
+            }
+        return {"elapsed_s": round(time.time() - self.started, 1), "phases": phases, "counters": dict(self.counters)}
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"\n⏱️ Phase timings ({summary['elapsed_s']}s run):")
+        print(f"   {'phase':<16}{'count':>8}{'total s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+        for name, s in sorted(summary["phases"].items(), key=lambda kv: -kv[1]["total_s"]):
+            print(f"   {name:<16}{s['count']:>8}{s['total_s']:>10}{s['p50_ms']:>10}{s['p90_ms']:>10}{s['p99_ms']:>10}")
+        for name, value in sorted(summary["counters"].items()):
+            print(f"   {name}: {value}")
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP scraper_phase_seconds Time spent per scraper phase.",
+            "# TYPE scraper_phase_seconds summary",
+        ]
+        for name, values in sorted(self.phase_ms.items()):
+            for q in (50, 90, 99):
+                lines.append(f'scraper_phase_seconds{{phase="{name}",quantile="{q / 100}"}} {percentile(values, q) / 1000:.6f}')
+            lines.append(f'scraper_phase_seconds_sum{{phase="{name}"}} {sum(values) / 1000:.6f}')
+            lines.append(f'scraper_phase_seconds_count{{phase="{name}"}} {len(values)}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE scraper_{name}_total counter")
+            lines.append(f"scraper_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        if self.log is not None:
+            self.log.flush()
+        if self.prometheus_path:
+            # the textfile collector may read at any moment: never let it see a half-written file
+            tmp_path = f"{self.prometheus_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, self.prometheus_path)
+
+    def close(self):
+        self.event("run_summary", **self.summary())
+        self.flush()
+        if self.log is not None:
+            self.log.close()
+            self.log = None
@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from urllib.parse import quote_plus
+
+# Search results straight from Google Maps' network traffic.
+# When the feed pages in, Maps fetches the next results from /search?tbm=map as a
+# JSON payload (prefixed with the )]}' XSSI guard). SearchResponseCapture listens
+# for those responses and turns them into list records, so the producer doesn't
+# have to poll the feed DOM for new cards. The payload layout is undocumented:
+# anything that doesn't parse marks the capture unusable and the producer falls
+# back to reading the cards from the DOM.
+#
+# Bodies can be saved with record_dir and replayed offline:
+#
+#   python network_results.py recorded/*.txt
+
+XSSI_PREFIX = ")]}'"
+
+# Positions inside one result's place array (payload[0][1][i][14])
+PLACE_INDEX = 14
+NAME_INDEX = 11
+ADDRESS_INDEX = 39
+COORDS_INDEX = 9          # [_, _, lat, lng]
+FEATURE_ID_INDEX = 10     # "0x...:0x..."
+PLACE_ID_INDEX = 78       # "ChIJ..."
+
+
+def is_search_response(url):
+    return "/search?" in url and "tbm=map" in url
+
+
+def _strip_payload(text):
+    """Payload JSON from a response body: bare `)]}'` JSON, or wrapped as {"c":..,"d":")]}'..."}/*""*/."""
+    text = text.strip()
+    if text.endswith('/*""*/'):
+        text = text[:-len('/*""*/')]
+        text = json.loads(text)["d"]
+    if text.startswith(XSSI_PREFIX):
+        text = text[len(XSSI_PREFIX):]
+    return json.loads(text)
+
+
+def _at(value, *path):
+    for i in path:
+        if not isinstance(value, list) or i >= len(value) or value[i] is None:
+            return None
+        value = value[i]
+    return value
+
+
+def place_href(name, feature_id):
+    """A /maps/place link the detail tabs can open (dedupe_index reads the feature id back out)."""
+    return f"/maps/place/{quote_plus(name)}/data=!4m2!3m1!1s{feature_id}"
+
+
+def parse_place(place):
+    """One place array -> list record, or None if it doesn't look like a place."""
+    name = _at(place, NAME_INDEX)
+    feature_id = _at(place, FEATURE_ID_INDEX)
+    if not isinstance(name, str) or not isinstance(feature_id, str) or not feature_id.startswith("0x"):
+        return None
+    address = _at(place, ADDRESS_INDEX)
+    return {
+        "name": name,
+        "address": address if isinstance(address, str) else "",
+        "sponsored": "",
+        "href": place_href(name, feature_id),
+        "scrapio": [],  # Scrap.io only exists in the DOM; these records go to the detail pane
+        "lat": _at(place, COORDS_INDEX, 2),
+        "lng": _at(place, COORDS_INDEX, 3),
+        "place_id": _at(place, PLACE_ID_INDEX) or "",
+        "feature_id": feature_id,
+    }
+
+
+def parse_search_payload(text):
+    """
+    Response body -> list of records. Raises ValueError when the body isn't a search
+    payload we understand (the caller falls back to the DOM).
+    """
+    try:
+        payload = _strip_payload(text)
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"not a Maps search payload: {e}")
+
+    results = _at(payload, 0, 1)
+    if not isinstance(results, list):
+        raise ValueError("no result list at [0][1]")
+
+    records = []
+    for result in results:
+        place = _at(result, PLACE_INDEX)
+        if place is None:
+            continue  # header entries and ads without a place
+        record = parse_place(place)
+        if record is not None:
+            records.append(record)
+    if results and not records:
+        raise ValueError(f"{len(results)} results but no place could be parsed")
+    return records
+
+
+class SearchResponseCapture:
+    """Collects parsed search responses for one page."""
+
+    def __init__(self, record_dir=None):
+        self.record_dir = record_dir
+        self.records = []        # parsed, not yet taken
+        self.responses = 0
+        self.usable = True       # False once a payload failed to parse
+        self.arrived = asyncio.Event()
+        self.page = None
+
+    def attach(self, page):
+        self.page = page
+        page.on("response", self._on_response)
+
+    def detach(self):
+        if self.page is not None:
+            self.page.remove_listener("response", self._on_response)
+            self.page = None
+
+    async def _on_response(self, response):
+        if not is_search_response(response.url):
+            return
+        try:
+            text = await response.text()
+        except Exception:
+            return  # the page navigated away before the body was read
+        self.responses += 1
+        if self.record_dir:
+            os.makedirs(self.record_dir, exist_ok=True)
+            path = os.path.join(self.record_dir, f"search_{int(time.time() * 1000)}_{self.responses}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        try:
+            self.records.extend(parse_search_payload(text))
+        except ValueError as e:
+            if self.usable:
+                print(f"⚠️ Could not parse a search response ({e}); reading cards from the page instead")
+            self.usable = False
+        self.arrived.set()
+
+    def take(self):
+        records, self.records = self.records, []
+        return records
+
+    async def wait_for_more(self, timeout=5000):
+        """True once a new search response arrived (parsed or not), False on timeout."""
+        if self.records:
+            return True
+        self.arrived.clear()
+        try:
+            await asyncio.wait_for(self.arrived.wait(), timeout / 1000)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse recorded Google Maps search responses")
+    parser.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    for path in args.files:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        try:
+            records = parse_search_payload(text)
+        except ValueError as e:
+            print(f"❌ {path}: {e}")
+            continue
+        print(f"✅ {path}: {len(records)} places")
+        for record in records:
+            print(f"   {record['name']} | {record['address']} | {record['lat']},{record['lng']} | "
+                  f"{record['place_id'] or record['feature_id']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import os
+
+# Keep long runs on fresh tabs.
+# A tab that has loaded thousands of Maps panes keeps growing (feed DOM, detached
+# nodes, V8 heap) until Chrome slows down or the renderer dies. Tabs are swapped for
+# a new one after a number of clinics / searches, or as soon as the renderer's own
+# metrics (CDP Performance.getMetrics) show the JS heap or DOM node count past a limit.
+# Crashed or closed tabs are replaced the same way, and the work item is retried.
+
+RECYCLE_CLINICS = int(os.environ.get("RECYCLE_CLINICS", 250))  # per detail tab
+RECYCLE_STATES = int(os.environ.get("RECYCLE_STATES", 5))      # per feed tab
+MAX_JS_HEAP_MB = float(os.environ.get("MAX_JS_HEAP_MB", 400))
+MAX_DOM_NODES = int(os.environ.get("MAX_DOM_NODES", 150000))
+
+# Renderer metrics cost a CDP round-trip; only look every few work items
+CHECK_EVERY = 20
+
+
+async def renderer_metrics(page):
+    """JSHeapUsedSize, Nodes, ... for `page` from CDP, or {} when the browser can't tell us."""
+    try:
+        session = await page.context.new_cdp_session(page)
+        try:
+            await session.send("Performance.enable")
+            result = await session.send("Performance.getMetrics")
+        finally:
+            await session.detach()
+    except Exception:
+        return {}
+    return {m["name"]: m["value"] for m in result.get("metrics", [])}
+
+
+class PageRecycler:
+    """Counts work per tab and decides when a tab should be replaced."""
+
+    def __init__(self, max_clinics=RECYCLE_CLINICS, max_states=RECYCLE_STATES,
+                 max_heap_mb=MAX_JS_HEAP_MB, max_nodes=MAX_DOM_NODES, check_every=CHECK_EVERY, metrics=None):
+        self.max_clinics = max_clinics
+        self.max_states = max_states
+        self.max_heap_mb = max_heap_mb
+        self.max_nodes = max_nodes
+        self.check_every = check_every
+        self.metrics = metrics
+        self.work = {}      # page -> work items since the tab was opened
+        self.crashed = set()
+
+    def track(self, page):
+        self.work[page] = 0
+        page.on("crash", lambda _: self.crashed.add(page))
+        return page
+
+    def forget(self, page):
+        self.work.pop(page, None)
+        self.crashed.discard(page)
+
+    def done(self, page):
+        """One clinic (detail tab) or search (feed tab) finished on `page`."""
+        self.work[page] = self.work.get(page, 0) + 1
+
+    def is_dead(self, page):
+        return page in self.crashed or page.is_closed()
+
+    async def reason_to_recycle(self, page, limit):
+        """Why `page` should be replaced before its next work item, or None."""
+        if self.is_dead(page):
+            return "crashed"
+
+        count = self.work.get(page, 0)
+        if limit and count >= limit:
+            return f"{count} work items"
+        if count == 0 or count % self.check_every:
+            return None
+
+        metrics = await renderer_metrics(page)
+        heap_mb = metrics.get("JSHeapUsedSize", 0) / 1e6
+        nodes = metrics.get("Nodes", 0)
+        if self.max_heap_mb and heap_mb > self.max_heap_mb:
+            return f"JS heap {heap_mb:.0f} MB"
+        if self.max_nodes and nodes > self.max_nodes:
+            return f"{nodes:.0f} DOM nodes"
+        return None
+
+    async def replace(self, page, open_page, close_page, reason):
+        """Close `page` and return a fresh one from `open_page()` (which should track it), or None."""
+        print(f"♻️ Recycling tab after {reason}")
+        if self.metrics is not None:
+            self.metrics.count("pages_recycled")
+            if reason == "crashed":
+                self.metrics.count("page_crashes")
+        self.forget(page)
+        await close_page(page)
+        return await open_page()
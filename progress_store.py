@@ -0,0 +1,94 @@
+import json
+import sqlite3
+import time
+
+# Durable scrape progress in a local SQLite file.
+# Records which states are finished and, inside a state, which clinics are
+# done together with what they produced, so a restarted run can skip
+# finished work and still write a complete file for a half-done state.
+# A finished tile that hit the result cap is marked as split, in the same write,
+# so a resumed run can plan its sub-tiles again.
+
+DEFAULT_PROGRESS_DB = "scrape_progress.db"
+
+
+class ProgressStore:
+    def __init__(self, path=DEFAULT_PROGRESS_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS states ("
+            " state TEXT PRIMARY KEY,"
+            " finished_at REAL NOT NULL,"
+            " split INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(states)")}
+        if "split" not in columns:  # stores written before tiles were journaled
+            self.conn.execute("ALTER TABLE states ADD COLUMN split INTEGER NOT NULL DEFAULT 0")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS clinics ("
+            " state TEXT NOT NULL,"
+            " clinic_key TEXT NOT NULL,"
+            " rows_json TEXT NOT NULL,"
+            " finished_at REAL NOT NULL,"
+            " PRIMARY KEY (state, clinic_key))"
+        )
+        self.conn.commit()
+
+    # ---- states ----
+
+    def done_states(self):
+        return {row[0] for row in self.conn.execute("SELECT state FROM states")}
+
+    def split_states(self):
+        """Finished shards that were split into sub-tiles."""
+        return {row[0] for row in self.conn.execute("SELECT state FROM states WHERE split = 1")}
+
+    def mark_state_done(self, state, split=False):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO states (state, finished_at, split) VALUES (?, ?, ?)",
+            (state, time.time(), int(split)),
+        )
+        self.conn.commit()
+
+    # ---- clinics within a state ----
+
+    def done_clinics(self, state):
+        """Keys of the clinics already finished for `state`."""
+        return {row[0] for row in self.conn.execute(
+            "SELECT clinic_key FROM clinics WHERE state = ?", (state,)
+        )}
+
+    def iter_clinic_rows(self, state):
+        """
+        What was journaled for each clinic of `state`, in the order the clinics finished:
+        Clinic.to_json() (older runs stored the padded rows), or [] for a skipped duplicate.
+        """
+        cursor = self.conn.execute(
+            "SELECT rows_json FROM clinics WHERE state = ? ORDER BY finished_at", (state,)
+        )
+        for (rows_json,) in cursor:
+            yield json.loads(rows_json)
+
+    def mark_clinic_done(self, state, clinic_key, rows):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO clinics (state, clinic_key, rows_json, finished_at) VALUES (?, ?, ?, ?)",
+            (state, clinic_key, json.dumps(rows), time.time()),
+        )
+        self.conn.commit()
+
+    # ---- housekeeping ----
+
+    def summary(self):
+        states = self.conn.execute("SELECT COUNT(*) FROM states").fetchone()[0]
+        clinics = self.conn.execute("SELECT COUNT(*) FROM clinics").fetchone()[0]
+        return {"states_done": states, "clinics_done": clinics}
+
+    def reset(self):
+        self.conn.execute("DELETE FROM states")
+        self.conn.execute("DELETE FROM clinics")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
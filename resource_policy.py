@@ -0,0 +1,145 @@
+import json
+import os
+import time
+
+# Block the heavy stuff Google Maps loads that we never read (map tiles,
+# imagery, photos, fonts) through Playwright request routing.
+# Everything the feed, the detail pane and the Scrap.io extension need still goes through.
+#
+# Traffic is metered per page; a state's detail tabs feed the meter of its feed
+# tab, so its numbers cover all of its traffic. Per-state load time and bytes are saved to
+# RESOURCE_STATS_FILE under the policy mode, so a run with blocking on can
+# report what it saved against a baseline run with blocking off.
+
+RESOURCE_STATS_FILE = "resource_stats.json"
+
+DEFAULT_BLOCKED_TYPES = {"image", "media", "font"}
+
+DEFAULT_BLOCKED_PATTERNS = [
+    "/maps/vt",                   # vector / raster map tiles
+    "/kh/v=",                     # satellite imagery
+    "khms",                       # satellite imagery servers
+    "streetviewpixels",           # street view thumbnails
+    "/maps/preview/photo",        # place photos
+    "lh3.googleusercontent.com",  # place / review photos
+    "lh5.googleusercontent.com",
+    "fonts.gstatic.com",
+    "fonts.googleapis.com",
+    "/gen_204",                   # logging pings
+    "/log?",
+]
+
+# Never blocked, whatever the type: the extension and its backend
+DEFAULT_ALLOWED_PATTERNS = [
+    "chrome-extension://",
+    "scrap.io",
+]
+
+
+class TrafficMeter:
+    """Requests, bytes and load time for one page (and its detail tabs), reset at the start of every state."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.monotonic()
+        self.load_ms = None
+        self.bytes_loaded = 0
+        self.requests = 0
+        self.blocked = {}  # resource type -> count
+
+    def mark_loaded(self):
+        if self.load_ms is None:
+            self.load_ms = (time.monotonic() - self.started) * 1000
+
+    def snapshot(self):
+        return {
+            "load_ms": round(self.load_ms or 0, 1),
+            "bytes_loaded": self.bytes_loaded,
+            "requests": self.requests,
+            "blocked": sum(self.blocked.values()),
+            "blocked_by_type": dict(self.blocked),
+        }
+
+
+class ResourcePolicy:
+    def __init__(self, enabled=True, blocked_types=None, blocked_patterns=None, allowed_patterns=None,
+                 stats_file=RESOURCE_STATS_FILE):
+        self.enabled = enabled
+        self.blocked_types = set(DEFAULT_BLOCKED_TYPES if blocked_types is None else blocked_types)
+        self.blocked_patterns = list(DEFAULT_BLOCKED_PATTERNS if blocked_patterns is None else blocked_patterns)
+        self.allowed_patterns = list(DEFAULT_ALLOWED_PATTERNS if allowed_patterns is None else allowed_patterns)
+        self.stats_file = stats_file
+        self.meters = {}
+
+    @property
+    def mode(self):
+        return "blocking" if self.enabled else "baseline"
+
+    def should_block(self, resource_type, url):
+        if any(p in url for p in self.allowed_patterns):
+            return False
+        return resource_type in self.blocked_types or any(p in url for p in self.blocked_patterns)
+
+    async def attach(self, page, meter=None):
+        """Start routing (if enabled) and metering for `page`, into `meter` if given (else a new one)."""
+        meter = meter or TrafficMeter()
+        self.meters[id(page)] = meter
+
+        def on_response(response):
+            meter.requests += 1
+
+        async def on_finished(request):
+            # what actually came over the wire: chunked and compressed responses often
+            # have no content-length, and it never covers the headers
+            try:
+                sizes = await request.sizes()
+                meter.bytes_loaded += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+            except Exception:  # sizes not available for this request: fall back to the header
+                try:
+                    response = await request.response()
+                    meter.bytes_loaded += int(response.headers.get("content-length", 0)) if response else 0
+                except Exception:
+                    pass
+
+        async def handle(route):
+            request = route.request
+            if self.should_block(request.resource_type, request.url):
+                meter.blocked[request.resource_type] = meter.blocked.get(request.resource_type, 0) + 1
+                await route.abort()
+            else:
+                await route.continue_()
+
+        page.on("response", on_response)
+        page.on("requestfinished", on_finished)
+        if self.enabled:
+            await page.route("**/*", handle)
+        return meter
+
+    def meter_for(self, page):
+        return self.meters.get(id(page))
+
+    def detach(self, page):
+        self.meters.pop(id(page), None)
+
+    def _load_stats(self):
+        if not os.path.exists(self.stats_file):
+            return {}
+        with open(self.stats_file, encoding="utf-8") as f:
+            return json.load(f)
+
+    def record_state(self, state, meter):
+        """Save this state's numbers and return them plus the deltas against the other mode."""
+        stats = self._load_stats()
+        current = meter.snapshot()
+        stats.setdefault(self.mode, {})[state] = current
+        with open(self.stats_file, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2)
+
+        report = dict(current)
+        baseline = stats.get("baseline", {}).get(state)
+        if self.enabled and baseline:
+            report["bytes_saved"] = baseline["bytes_loaded"] - current["bytes_loaded"]
+            report["load_ms_delta"] = round(current["load_ms"] - baseline["load_ms"], 1)
+        return report
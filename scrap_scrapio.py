@@ -2,6 +2,8 @@ import asyncio
 from playwright.async_api import async_playwright
 import pandas as pd
 
+from resource_policy import ResourcePolicy
+
 async def run():
     async with async_playwright() as p:
         # Connect to the existing Chrome instance via CDP
@@ -10,6 +12,7 @@ async def run():
         # Use the default browser context (existing tabs/extensions, etc.)
         context = browser.contexts[0]  # Use the first (main) context
         page = await context.new_page()
+        await ResourcePolicy().attach(page)  # skip map tiles, photos and fonts
 
         # Open Google Maps with clinic search
         await page.goto("https://www.google.com/maps/search/Dental+Clinic+new+york/")
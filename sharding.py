@@ -0,0 +1,212 @@
+import json
+import math
+import os
+import re
+from urllib.parse import quote_plus
+
+# Split a state search into smaller Google Maps searches ("shards").
+# One Maps query stops after ~120 results, so a single "Dental Clinic California"
+# search never sees most of the state. A shard is either the whole state (the
+# old behaviour), one city, or one lat/lng box searched through an @lat,lng,zoom
+# URL. Box shards that come back full are split into four and searched again;
+# overlaps between shards are merged by the dedupe index.
+# The zoom is picked so the whole box is on screen, which means Maps also returns
+# places around it; results whose coordinates fall outside the box are dropped.
+
+SEARCH_TERM = "Dental Clinic"
+
+# Point this at a local fixture server (maps_fixture_server.py) to scrape offline
+MAPS_BASE_URL = os.environ.get("MAPS_BASE_URL", "https://www.google.com").rstrip("/")
+
+# Results Google Maps returns for one query before it stops paging
+RESULT_CAP = 120
+
+# Boxes are split into TILE_GRID x TILE_GRID to start with, then in four when full
+TILE_GRID = 2
+MAX_TILE_DEPTH = 6
+
+# Size of the map area in CSS pixels: the browser window minus the ~410 px results panel
+MAP_VIEWPORT = tuple(int(v) for v in os.environ.get("MAP_VIEWPORT", "870x720").split("x"))
+TILE_PX = 256  # Web Mercator: the whole world is 256 px wide at zoom 0
+
+# .../data=!4m7!3m6!1s0x...:0x...!8m2!3d40.7128!4d-74.006!16s...
+HREF_COORDS_RE = re.compile(r"!3d(-?\d+(?:\.\d+)?)!4d(-?\d+(?:\.\d+)?)")
+
+# (south, west, north, east), rounded outward
+STATE_BOUNDS = {
+    "Alabama": (30.14, -88.47, 35.01, -84.89),
+    "Alaska": (51.2, -179.15, 71.4, -129.98),
+    "Arizona": (31.33, -114.82, 37.0, -109.05),
+    "Arkansas": (33.0, -94.62, 36.5, -89.64),
+    "California": (32.53, -124.41, 42.01, -114.13),
+    "Colorado": (36.99, -109.06, 41.0, -102.04),
+    "Connecticut": (40.98, -73.73, 42.05, -71.79),
+    "Delaware": (38.45, -75.79, 39.84, -75.05),
+    "Florida": (24.52, -87.63, 31.0, -80.03),
+    "Georgia": (30.36, -85.61, 35.0, -80.84),
+    "Hawaii": (18.91, -160.24, 22.24, -154.81),
+    "Idaho": (41.99, -117.24, 49.0, -111.04),
+    "Illinois": (36.97, -91.51, 42.51, -87.02),
+    "Indiana": (37.77, -88.1, 41.76, -84.78),
+    "Iowa": (40.38, -96.64, 43.5, -90.14),
+    "Kansas": (36.99, -102.05, 40.0, -94.59),
+    "Kentucky": (36.5, -89.57, 39.15, -81.96),
+    "Louisiana": (28.93, -94.04, 33.02, -88.82),
+    "Maine": (43.06, -71.08, 47.46, -66.95),
+    "Maryland": (37.91, -79.49, 39.72, -75.05),
+    "Massachusetts": (41.24, -73.51, 42.89, -69.93),
+    "Michigan": (41.7, -90.42, 48.31, -82.41),
+    "Minnesota": (43.5, -97.24, 49.38, -89.49),
+    "Mississippi": (30.17, -91.66, 35.0, -88.1),
+    "Missouri": (35.99, -95.77, 40.61, -89.1),
+    "Montana": (44.36, -116.05, 49.0, -104.04),
+    "Nebraska": (40.0, -104.05, 43.0, -95.31),
+    "Nevada": (35.0, -120.01, 42.0, -114.04),
+    "New Hampshire": (42.7, -72.56, 45.31, -70.61),
+    "New Jersey": (38.93, -75.56, 41.36, -73.89),
+    "New Mexico": (31.33, -109.05, 37.0, -103.0),
+    "New York": (40.5, -79.76, 45.02, -71.86),
+    "North Carolina": (33.84, -84.32, 36.59, -75.46),
+    "North Dakota": (45.94, -104.05, 49.0, -96.55),
+    "Ohio": (38.4, -84.82, 41.98, -80.52),
+    "Oklahoma": (33.62, -103.0, 37.0, -94.43),
+    "Oregon": (41.99, -124.57, 46.29, -116.46),
+    "Pennsylvania": (39.72, -80.52, 42.27, -74.69),
+    "Rhode Island": (41.15, -71.86, 42.02, -71.12),
+    "South Carolina": (32.03, -83.35, 35.22, -78.54),
+    "South Dakota": (42.48, -104.06, 45.95, -96.44),
+    "Tennessee": (34.98, -90.31, 36.68, -81.65),
+    "Texas": (25.84, -106.65, 36.5, -93.51),
+    "Utah": (36.99, -114.05, 42.0, -109.04),
+    "Vermont": (42.73, -73.44, 45.02, -71.46),
+    "Virginia": (36.54, -83.68, 39.47, -75.24),
+    "Washington": (45.54, -124.85, 49.0, -116.92),
+    "West Virginia": (37.2, -82.64, 40.64, -77.72),
+    "Wisconsin": (42.49, -92.89, 47.08, -86.25),
+    "Wyoming": (40.99, -111.06, 45.01, -104.05),
+}
+
+
+class Shard:
+    """
+    One schedulable search. `id` names the output file, the progress entry
+    and the dedupe owner, so a whole-state shard keeps the old names.
+    """
+
+    def __init__(self, state, id, query_url, bbox=None, depth=0):
+        self.state = state
+        self.id = id
+        self.query_url = query_url
+        self.bbox = bbox
+        self.depth = depth
+        self.attempts = 0  # times the shard was handed back after a block page or tab crash
+
+    @property
+    def is_tile(self):
+        return self.bbox is not None
+
+    def __repr__(self):
+        return f"Shard({self.id!r})"
+
+
+def state_shard(state):
+    """The whole state as one search, exactly like the unsharded scraper."""
+    return Shard(state, state, f"{MAPS_BASE_URL}/maps/search/{quote_plus(SEARCH_TERM)}+{quote_plus(state)}/")
+
+
+def city_shards(state, cities):
+    return [
+        Shard(state, f"{state}__{city}",
+              f"{MAPS_BASE_URL}/maps/search/{quote_plus(SEARCH_TERM)}+{quote_plus(city)}+{quote_plus(state)}/")
+        for city in cities
+    ]
+
+
+def zoom_for(bbox, viewport=MAP_VIEWPORT):
+    """Largest whole zoom at which the box fits in a `viewport` (width, height) px map."""
+    south, west, north, east = bbox
+    width, height = viewport
+    # degrees per pixel at zoom z: 360 / (TILE_PX * 2**z), latitude stretched by 1/cos(lat)
+    by_width = math.log2(width * 360 / (TILE_PX * max(east - west, 1e-4)))
+    by_height = math.log2(height * 360 * math.cos(math.radians((north + south) / 2))
+                          / (TILE_PX * max(north - south, 1e-4)))
+    return max(6, min(17, math.floor(min(by_width, by_height))))
+
+
+def record_coords(record):
+    """(lat, lng) of a list record: the search response gives them, cards carry them in the href."""
+    if record.get("lat") is not None and record.get("lng") is not None:
+        return record["lat"], record["lng"]
+    match = HREF_COORDS_RE.search(record.get("href") or "")
+    return (float(match.group(1)), float(match.group(2))) if match else None
+
+
+def in_shard(shard, record):
+    """False only for a tile result we know lies outside the tile (no coordinates: keep it)."""
+    if not shard.is_tile:
+        return True
+    coords = record_coords(record)
+    if coords is None:
+        return True
+    south, west, north, east = shard.bbox
+    return south <= coords[0] <= north and west <= coords[1] <= east
+
+
+def tile_shard(state, bbox, path, depth):
+    south, west, north, east = bbox
+    lat, lng = (south + north) / 2, (west + east) / 2
+    url = (f"{MAPS_BASE_URL}/maps/search/{quote_plus(SEARCH_TERM)}/"
+           f"@{lat:.5f},{lng:.5f},{zoom_for(bbox)}z")
+    return Shard(state, f"{state}__tile{path}", url, bbox=bbox, depth=depth)
+
+
+def split_bbox(bbox, n):
+    """Split a box into an n x n grid, row by row from the south-west corner."""
+    south, west, north, east = bbox
+    dlat, dlng = (north - south) / n, (east - west) / n
+    return [
+        (south + r * dlat, west + c * dlng, south + (r + 1) * dlat, west + (c + 1) * dlng)
+        for r in range(n) for c in range(n)
+    ]
+
+
+def tile_shards(state, grid=TILE_GRID):
+    return [tile_shard(state, box, str(i), 1) for i, box in enumerate(split_bbox(STATE_BOUNDS[state], grid))]
+
+
+def subdivide(shard):
+    """Four smaller tiles covering `shard`, or [] if it can't or shouldn't be split further."""
+    if not shard.is_tile or shard.depth >= MAX_TILE_DEPTH:
+        return []
+    path = shard.id.rsplit("__tile", 1)[1]
+    return [tile_shard(shard.state, box, f"{path}-{i}", shard.depth + 1)
+            for i, box in enumerate(split_bbox(shard.bbox, 2))]
+
+
+def needs_split(shard, found):
+    """A tile that returned a full page of results probably has more behind the cap."""
+    return shard.is_tile and found >= RESULT_CAP
+
+
+def load_cities(path):
+    """Cities file: {"California": ["Los Angeles", "San Diego", ...], ...}"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def plan_shards(states, mode="state", cities=None):
+    """
+    Work units for `states`:
+      "state"  - one search per state
+      "cities" - one search per city in `cities` (states without cities stay whole)
+      "tiles"  - lat/lng boxes over the state, split further when full
+    """
+    shards = []
+    for state in states:
+        if mode == "tiles" and state in STATE_BOUNDS:
+            shards.extend(tile_shards(state))
+        elif mode == "cities" and cities and cities.get(state):
+            shards.extend(city_shards(state, cities[state]))
+        else:
+            shards.append(state_shard(state))
+    return shards
@@ -0,0 +1,229 @@
+import csv
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from clinic_model import CLINIC_TABLE_COLUMNS, CONTACT_TABLE_COLUMNS, OUTPUT_COLUMNS, wide_rows_from_tables
+
+# Streaming output writers.
+# Rows are buffered and appended to disk in batches, flushed every `batch_size`
+# rows or every `flush_interval` seconds, whichever comes first, so memory stays
+# flat and a crash loses at most one batch. Excel is an optional export at the end.
+# ClinicSink pairs two of them for the normalized clinics / contacts tables.
+
+
+class RowSink:
+    extension = ""
+
+    def __init__(self, path, columns, batch_size=200, flush_interval=30):
+        self.path = path
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.rows_written = 0
+        self.last_flush = time.monotonic()
+
+    def write_rows(self, rows):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self._write_batch([{c: row.get(c, "") for c in self.columns} for row in self.buffer])
+            self.rows_written += len(self.buffer)
+            self.buffer = []
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self._close()
+
+    def _write_batch(self, rows):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvSink(RowSink):
+    extension = ".csv"
+
+    def __init__(self, path, columns, **kwargs):
+        super().__init__(path, columns, **kwargs)
+        # utf-8-sig so Excel opens it right, like the other scripts' CSVs
+        self.file = open(path, "w", newline="", encoding="utf-8-sig")
+        self.writer = csv.DictWriter(self.file, fieldnames=self.columns)
+        self.writer.writeheader()
+        self.file.flush()
+
+    def _write_batch(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def _close(self):
+        self.file.close()
+
+
+class ParquetSink(RowSink):
+    extension = ".parquet"
+
+    def __init__(self, path, columns, **kwargs):
+        super().__init__(path, columns, **kwargs)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow")
+        self.pa = pa
+        self.schema = pa.schema([(c, pa.string()) for c in self.columns])
+        # every flushed batch becomes one row group
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def _write_batch(self, rows):
+        table = self.pa.Table.from_pylist(rows, schema=self.schema)
+        self.writer.write_table(table)
+
+    def _close(self):
+        self.writer.close()
+
+
+class SqliteSink(RowSink):
+    extension = ".sqlite"
+
+    def __init__(self, path, columns, table="clinics", **kwargs):
+        super().__init__(path, columns, **kwargs)
+        self.table = table
+        self.conn = sqlite3.connect(path)
+        quoted = [f'"{c}"' for c in self.columns]
+        self.conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+        self.conn.execute(f'CREATE TABLE "{table}" ({", ".join(q + " TEXT" for q in quoted)})')
+        self.conn.commit()
+        self.insert_sql = (
+            f'INSERT INTO "{table}" ({", ".join(quoted)}) VALUES ({", ".join("?" for _ in quoted)})'
+        )
+
+    def _write_batch(self, rows):
+        self.conn.executemany(self.insert_sql, [[row[c] for c in self.columns] for row in rows])
+        self.conn.commit()
+
+    def _close(self):
+        self.conn.close()
+
+
+SINKS = {
+    "csv": CsvSink,
+    "parquet": ParquetSink,
+    "sqlite": SqliteSink,
+}
+
+
+def open_sink(output_format, base_filename, columns, **kwargs):
+    """Open a sink for `base_filename` (no extension) in the given format."""
+    if output_format not in SINKS:
+        raise ValueError(f"Unknown output format {output_format!r}, pick one of {', '.join(SINKS)}")
+    sink_class = SINKS[output_format]
+    return sink_class(base_filename + sink_class.extension, columns, **kwargs)
+
+
+class ClinicSink:
+    """
+    Normalized output for one search: a clinics table and a long contacts table.
+    csv / parquet write <base>_clinics and <base>_contacts; sqlite puts both tables in <base>.sqlite.
+    """
+
+    def __init__(self, output_format, base_filename, **kwargs):
+        if output_format == "sqlite":
+            path = base_filename + SqliteSink.extension
+            self.clinics = SqliteSink(path, CLINIC_TABLE_COLUMNS, table="clinics", **kwargs)
+            self.contacts = SqliteSink(path, CONTACT_TABLE_COLUMNS, table="contacts", **kwargs)
+        else:
+            self.clinics = open_sink(output_format, base_filename + "_clinics", CLINIC_TABLE_COLUMNS, **kwargs)
+            self.contacts = open_sink(output_format, base_filename + "_contacts", CONTACT_TABLE_COLUMNS, **kwargs)
+
+    @property
+    def path(self):
+        return self.clinics.path
+
+    def write(self, clinic):
+        self.clinics.write_rows([clinic.clinic_row()])
+        self.contacts.write_rows(clinic.contact_rows())
+
+    def close(self):
+        self.clinics.close()
+        self.contacts.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_sink_output(path, table="clinics"):
+    """Load a file written by one of the sinks back into a DataFrame."""
+    if path.endswith(".csv"):
+        return pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    if path.endswith(".sqlite"):
+        conn = sqlite3.connect(path)
+        try:
+            return pd.read_sql_query(f'SELECT * FROM "{table}"', conn)
+        finally:
+            conn.close()
+    raise ValueError(f"Don't know how to read {path}")
+
+
+# Rows per worksheet, header included
+EXCEL_MAX_ROWS = 1048576
+
+
+def write_excel_streaming(rows, path, columns, sheet_title="Sheet1"):
+    """
+    Write dict rows to .xlsx with openpyxl's write-only mode, so memory stays flat however
+    many rows there are. Rows past Excel's sheet limit continue on "<title> (2)", ...
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows, sheets = None, 0, 0
+    for row in rows:
+        if sheet is None or sheet_rows >= EXCEL_MAX_ROWS:
+            sheets += 1
+            sheet = workbook.create_sheet(sheet_title if sheets == 1 else f"{sheet_title} ({sheets})")
+            sheet.append(columns)
+            sheet_rows = 1
+        sheet.append([row.get(c, "") for c in columns])
+        sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet(sheet_title).append(columns)
+    workbook.save(path)
+    return path
+
+
+def write_wide(rows, out_path):
+    """Padded wide rows to .xlsx (streamed) or .csv."""
+    if out_path.endswith(".csv"):
+        with CsvSink(out_path, OUTPUT_COLUMNS, batch_size=10000) as sink:
+            for row in rows:
+                sink.write_rows([row])
+        return out_path
+    return write_excel_streaming(rows, out_path, OUTPUT_COLUMNS)
+
+
+def export_wide(clinics_path, contacts_path, out_path):
+    """The legacy padded wide layout, derived from the clinics / contacts tables (.xlsx or .csv)."""
+    clinics = read_sink_output(clinics_path, "clinics").to_dict("records")
+    contacts = read_sink_output(contacts_path, "contacts").to_dict("records")
+    return write_wide(wide_rows_from_tables(clinics, contacts), out_path)
@@ -0,0 +1,250 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from extraction import (
+    DETAIL_NAME_XPATH, DETAIL_ADDRESS_XPATH, SPONSORED_XPATH, SCRAPIO_ROWS_XPATH, STREET_SEGMENT_RE, merge_detail,
+)
+from clinic_model import Clinic
+from sinks import ClinicSink
+
+# Raw HTML archive + offline re-extraction.
+# While scraping with --snapshots, every clinic's result card (and its detail pane,
+# when one was opened) is appended to snapshots/<shard>.jsonl.gz. Fixing a parser
+# bug then only means re-running this module over the archive. Clinics whose pane
+# came from the detail cache have no pane HTML; their cached record is archived
+# instead and re-extracted as is.
+#
+#   python snapshot_archive.py snapshots/ --out-dir reextracted --workers 8
+#
+# Each shard file is parsed with lxml in its own process and written with the same
+# clinics / contacts schema (and the same sinks) as the live scraper.
+#
+# Every clinic is its own gzip member, written and flushed as soon as it is added,
+# so a run that dies loses at most the clinic it was writing. The reader skips a
+# truncated member and carries on with whatever a resumed run appended after it.
+
+DEFAULT_SNAPSHOT_DIR = "snapshots"
+SNAPSHOT_COMPRESSLEVEL = 6  # per-clinic members are small; 9 only costs CPU
+GZIP_MAGIC = b"\x1f\x8b\x08"
+READ_CHUNK = 1 << 16
+
+
+class SnapshotArchive:
+    """Appends one gzip member (one JSON line) per clinic to a file per shard."""
+
+    def __init__(self, directory=DEFAULT_SNAPSHOT_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.files = {}
+
+    def path_for(self, state):
+        return os.path.join(self.directory, f"{state.replace(' ', '_')}.jsonl.gz")
+
+    def add(self, state, key, list_record, detail_html=None, detail_record=None):
+        entry = {
+            "ts": round(time.time(), 3),
+            "state": state,
+            "key": key,
+            "list": {k: v for k, v in list_record.items() if k != "html"},
+            "card_html": list_record.get("html"),
+            "detail_html": detail_html,
+        }
+        if detail_record is not None:
+            entry["detail_record"] = {k: v for k, v in detail_record.items() if k != "html"}
+        if state not in self.files:
+            # gzip members can be appended, so a resumed run just adds to the file
+            self.files[state] = open(self.path_for(state), "ab")
+        f = self.files[state]
+        f.write(gzip.compress((json.dumps(entry) + "\n").encode("utf-8"), SNAPSHOT_COMPRESSLEVEL))
+        f.flush()
+
+    def close_state(self, state):
+        f = self.files.pop(state, None)
+        if f is not None:
+            f.close()
+
+    def close(self):
+        for state in list(self.files):
+            self.close_state(state)
+
+
+def _read_member(data, pos):
+    """Decompress the gzip member starting at `pos`. Returns (bytes, end of the member)."""
+    d = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    out = []
+    while not d.eof:
+        if pos >= len(data):
+            raise EOFError("gzip member has no end marker")
+        chunk = data[pos:pos + READ_CHUNK]
+        out.append(d.decompress(chunk))
+        pos += len(chunk)
+    return b"".join(out), pos - len(d.unused_data)
+
+
+def iter_snapshots(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    data = memoryview(raw)
+    pos = 0
+    while pos < len(data):
+        try:
+            text, end = _read_member(data, pos)
+        except (EOFError, zlib.error):
+            # a run killed mid-write: skip to the next member a resumed run appended, if any
+            end = raw.find(GZIP_MAGIC, pos + 1)
+            if end < 0:
+                return
+            pos = end
+            continue
+        pos = end
+        for line in text.decode("utf-8", errors="replace").splitlines():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue  # archives from before per-clinic members can end in a truncated line
+
+
+# ---- offline parsing (mirrors LIST_EXTRACT_JS / DETAIL_EXTRACT_JS) ----
+
+def _lxml_html():
+    try:
+        import lxml.html
+    except ImportError:
+        raise RuntimeError("Offline re-extraction needs lxml: pip install lxml")
+    return lxml.html
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _clean(text):
+    return re.sub("[\u2066-\u2069]", "", text or "").strip()
+
+
+def _text(nodes):
+    return nodes[0].text_content().strip() if nodes else ""
+
+
+def parse_detail_html(html):
+    """Detail pane outerHTML -> the record extract_detail would have returned."""
+    root = _lxml_html().fromstring(html)
+    scrapio = []
+    for row in root.xpath(SCRAPIO_ROWS_XPATH):
+        links = row.xpath(".//a")
+        scrapio.append({"type": row.get("data-type"), "href": links[0].get("href") if links else None})
+    return {
+        "name": _text(root.xpath(DETAIL_NAME_XPATH)),
+        "address": _text(root.xpath(DETAIL_ADDRESS_XPATH)),
+        "sponsored": _text(root.xpath(SPONSORED_XPATH)),
+        "scrapio": scrapio,
+    }
+
+
+def parse_card_html(html):
+    """Result card outerHTML -> the record extract_list would have returned."""
+    card = _lxml_html().fromstring(html)
+    anchors = card.xpath(f"descendant-or-self::a[{_has_class('hfpxzc')}]")
+    anchor = anchors[0] if anchors else None
+    bodies = card.xpath(f".//*[{_has_class('bfdHYd')}]")
+    body = bodies[0] if bodies else None
+    heading = body.xpath(f".//*[{_has_class('qBF1Pd')}]") if body is not None else []
+
+    address = ""
+    if body is not None:
+        for line in body.xpath(f".//*[{_has_class('W4Efsd')}]"):
+            if line.xpath(f".//*[{_has_class('W4Efsd')}]"):
+                continue
+            parts = line.text_content().split("·")
+            last = _clean(parts[-1])
+            if len(parts) > 1 and STREET_SEGMENT_RE.search(last):
+                address = last
+                break
+
+    scrapio = []
+    if body is not None:
+        for sibling in body.itersiblings():
+            for item in sibling.xpath(f".//*[{_has_class('scrapio-icon-detail')} and {_has_class('scrapio-card-social__item')}]"):
+                scrapio.append({"type": item.get("data-type"), "href": item.get("data-url")})
+
+    return {
+        "name": _clean(heading[0].text_content() if heading else (anchor.get("aria-label") if anchor is not None else "")),
+        "address": address,
+        "sponsored": "Sponsored" if "Sponsored" in card.text_content() else "",
+        "href": (anchor.get("href") if anchor is not None else "") or "",
+        "scrapio": scrapio,
+    }
+
+
+def snapshot_record(entry):
+    """Rebuild the clinic record for one archived entry, the way consume_cards does."""
+    list_record = dict(entry["list"])
+    if entry.get("card_html"):
+        list_record.update(parse_card_html(entry["card_html"]))
+    if entry.get("detail_html"):
+        return merge_detail(list_record, parse_detail_html(entry["detail_html"]))
+    if entry.get("detail_record"):
+        return dict(entry["detail_record"])  # a detail cache hit: exactly what the live run wrote
+    return list_record
+
+
+def reextract_file(path, out_dir, output_format="csv"):
+    """Re-parse one shard's archive into fresh output files. Returns (clinics file, clinics, contacts)."""
+    entries = {}
+    for entry in iter_snapshots(path):
+        entries[entry["key"]] = entry  # a retried clinic: the last snapshot wins
+
+    state = os.path.basename(path)[:-len(".jsonl.gz")]
+    sink = ClinicSink(output_format, os.path.join(out_dir, f"scrapio_clinics_{state}"))
+    written = set()
+    with sink:
+        for entry in entries.values():
+            record = snapshot_record(entry)
+            if (record["name"], record["address"]) in written:
+                continue
+            written.add((record["name"], record["address"]))
+            sink.write(Clinic.from_record(record))
+    return sink.path, len(written), sink.contacts.rows_written
+
+
+def reextract(snapshot_dir, out_dir, output_format="csv", workers=None):
+    paths = sorted(glob.glob(os.path.join(snapshot_dir, "*.jsonl.gz")))
+    if not paths:
+        print(f"⚠️ No snapshots found in {snapshot_dir}")
+        return []
+    os.makedirs(out_dir, exist_ok=True)
+
+    started = time.monotonic()
+    print(f"🧩 Re-extracting {len(paths)} shard archives with {workers or os.cpu_count()} processes...")
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(reextract_file, path, out_dir, output_format) for path in paths]
+        for future in futures:
+            filename, clinics, contacts = future.result()
+            print(f"✅ {filename}: {clinics} clinics, {contacts} contacts")
+            results.append((filename, clinics, contacts))
+
+    print(f"🎉 {sum(r[1] for r in results)} clinics re-extracted in {time.monotonic() - started:.1f}s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-extract clinic rows from a raw HTML snapshot archive")
+    parser.add_argument("snapshot_dir", nargs="?", default=DEFAULT_SNAPSHOT_DIR)
+    parser.add_argument("--out-dir", default="reextracted")
+    parser.add_argument("--format", default="csv", choices=["csv", "parquet", "sqlite"])
+    parser.add_argument("--workers", type=int, help="processes to use (default: one per CPU)")
+    args = parser.parse_args()
+
+    reextract(args.snapshot_dir, args.out_dir, args.format, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import json
+import os
+
+import pytest
+
+from network_results import parse_search_payload
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "search_tbm_map.txt")
+
+
+@pytest.fixture
+def body():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return f.read()
+
+
+def wrapped(body):
+    """The same body the way the feed's XHR delivers it."""
+    return json.dumps({"c": 0, "d": body}) + '/*""*/'
+
+
+@pytest.mark.parametrize("wrap", [False, True], ids=["bare", "wrapped"])
+def test_parses_every_place(body, wrap):
+    records = parse_search_payload(wrapped(body) if wrap else body)
+
+    assert [r["name"] for r in records] == [
+        "Example Family Dentistry",
+        "Sample Smiles Orthodontics",
+        "Placeholder Dental Clinic",
+    ]
+    first = records[0]
+    assert first["address"] == "123 Example St, Cheyenne, WY 82001"
+    assert (first["lat"], first["lng"]) == (41.1399814, -104.8202462)
+    assert first["place_id"] == "ChIJExampleExampleExample01"
+    assert first["feature_id"] == "0x876f3d1a0b1c2d3e:0x1a2b3c4d5e6f7081"
+    assert first["href"].endswith("!1s0x876f3d1a0b1c2d3e:0x1a2b3c4d5e6f7081")
+    assert first["scrapio"] == []
+
+
+def test_header_entry_is_skipped(body):
+    # the first result is the query header, which has no place array
+    assert len(parse_search_payload(body)) == len(json.loads(body[len(")]}'"):])[0][1]) - 1
+
+
+@pytest.mark.parametrize("text", ["", "<html>captcha</html>", ")]}'\n[[\"q\",null]]", '{"c":0}/*""*/'])
+def test_rejects_what_it_does_not_understand(text):
+    with pytest.raises(ValueError):
+        parse_search_payload(text)
@@ -0,0 +1,99 @@
+import time
+from collections import defaultdict
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# Event-driven waits shared by the scraping scripts.
+# Every wait returns as soon as its condition holds, gives up after `timeout` ms
+# and records how long it actually took in WAIT_TIMINGS (name -> list of ms).
+
+WAIT_TIMINGS = defaultdict(list)
+
+CARD_CSS = "div[role=feed] .qBF1Pd"
+DETAIL_HEADING_CSS = "h1.DUwDvf"
+SCRAPIO_ROWS_CSS = ".m6QErb.DxyBCb.kA9KIf.dS8AEf.XiKgde .scrapio-card-main__body .scrapio-card-main__rows"
+END_OF_LIST_XPATH = "//*[contains(text(), 'reached the end of the list.')]"
+
+
+async def _timed(name, awaitable):
+    start = time.perf_counter()
+    try:
+        await awaitable
+        ok = True
+    except PlaywrightTimeoutError:
+        ok = False
+    WAIT_TIMINGS[name].append((time.perf_counter() - start) * 1000)
+    return ok
+
+
+async def wait_for_feed(page, timeout=5000):
+    """Wait until the results feed is attached after a search."""
+    return await _timed("feed", page.wait_for_selector("div[role=feed]", state="attached", timeout=timeout))
+
+
+async def wait_for_more_cards(page, prev_count, timeout=5000):
+    """Wait until the feed holds more than `prev_count` cards."""
+    return await _timed("more_cards", page.wait_for_function(
+        "([css, prev]) => document.querySelectorAll(css).length > prev",
+        arg=[CARD_CSS, prev_count],
+        timeout=timeout,
+    ))
+
+
+async def wait_for_detail(page, expected_name="", previous_name="", timeout=5000, place=""):
+    """
+    Wait until the detail heading shows the clicked clinic.
+    Matches `expected_name` when we know it (the card's aria-label),
+    otherwise waits for the heading to change away from `previous_name`.
+    With `place` (dedupe_index.place_id_from_url of the card's link) the page URL must
+    also name that place: two cards in a row of the same chain share a heading.
+    """
+    return await _timed("detail", page.wait_for_function(
+        """([css, expected, previous, place]) => {
+            if (place) {
+                let url = location.href;
+                try { url = decodeURIComponent(url); } catch (e) {}
+                if (!url.toLowerCase().includes(place.toLowerCase())) return false;
+            }
+            const h1 = document.querySelector(css);
+            if (!h1) return false;
+            const text = h1.innerText.trim();
+            return expected ? text === expected.trim() : (text !== "" && text !== previous);
+        }""",
+        arg=[DETAIL_HEADING_CSS, expected_name or "", previous_name or "", place or ""],
+        timeout=timeout,
+    ))
+
+
+async def mark_scrapio_rows_stale(page):
+    """Tag the Scrap.io rows of the pane on screen, so wait_for_scrapio_rows skips them after the next click."""
+    await page.evaluate(
+        "(css) => document.querySelectorAll(css).forEach((el) => el.setAttribute('data-scraper-stale', ''))",
+        SCRAPIO_ROWS_CSS,
+    )
+
+
+async def wait_for_scrapio_rows(page, timeout=3000):
+    """Wait until the Scrap.io extension has attached rows (not ones marked stale) to the detail pane."""
+    return await _timed("scrapio_rows", page.wait_for_selector(
+        f"{SCRAPIO_ROWS_CSS}:not([data-scraper-stale])", state="attached", timeout=timeout))
+
+
+def wait_stats():
+    """Per wait name: count and mean / max ms."""
+    stats = {}
+    for name, timings in WAIT_TIMINGS.items():
+        if not timings:
+            continue
+        stats[name] = {
+            "count": len(timings),
+            "mean_ms": round(sum(timings) / len(timings), 1),
+            "max_ms": round(max(timings), 1),
+        }
+    return stats
+
+
+def print_wait_stats():
+    print("\n⏱️ Wait timings:")
+    for name, s in wait_stats().items():
+        print(f"   {name}: {s['count']} waits, avg {s['mean_ms']} ms, max {s['max_ms']} ms")